@@ -3,6 +3,7 @@
 # supposed to be compatible with multiple platforms,
 # currently supported and tested: Win7
 
+from __future__ import print_function
 import sys
 import glob
 import subprocess
@@ -12,7 +13,7 @@ import logging
 logging.basicConfig(level = logging.DEBUG)
 
 def waitForUser():
-    print "hit <enter> to continue"
+    print("hit <enter> to continue")
     sys.stdout.flush()
     input = sys.stdin.readline()
 
@@ -32,7 +33,7 @@ def git(*args, **kwargs):
         p = subprocess.Popen(cmd, cwd = WORKDIR,
                              stdout = subprocess.PIPE,
                              stderr = subprocess.PIPE)
-    except OSError, e:
+    except OSError as e:
         logging.error("GIT was not found! "
                       "Please ensure it is installed and in $PATH!")
         logging.error(e)
@@ -45,7 +46,7 @@ def git(*args, **kwargs):
     if p.returncode != kwargs.get("expectedReturnCode", 0):
         logging.error(err)
         cleanup(1)
-    return cmd, "\n".join([s for s in out, err if len(s) > 0])
+    return cmd, "\n".join([s for s in (out, err) if len(s) > 0])
 
 def cleanup(exitCode):
     waitForUser()
@@ -171,7 +172,7 @@ class BitbucketClient(object):
         data['Content-Disposition'] += basename
         data['key'] += basename
         if self._DBG:
-            print data
+            print(data)
             return None
         with open(filename, 'rb') as fp:
             files = {'file': (basename, fp)}
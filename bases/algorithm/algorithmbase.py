@@ -160,10 +160,11 @@ class AlgorithmBase(object):
                 "Parameters not configured! "
                 "Set up {name} by calling factory() first."
                 .format(name = type(self).__name__))
-        paramTypes = self.params()
-        self._parameters = None
-        for ptype in paramTypes:
-            self.setParam(ptype())
+        # instantiate all parameters at once, keeping their order; each
+        # replaces its type, no need to look it up as in setParam()
+        self._parameters = [ptype() for ptype in self.params()]
+        for p in self._parameters:
+            setattr(self, p.name(), p)
 
     def __str__(self):
         text = [ self.name() ]
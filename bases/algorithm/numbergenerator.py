@@ -13,16 +13,59 @@ from future.utils import with_metaclass
 # the current implementation (types/classes only)
 # instances could be constructed with parameters, eg for randomExp or const
 
+def makeRandomGenerator(seed = None):
+    """Returns a numpy random number generator for the given seed, the
+    PCG64 based Generator if available, RandomState on numpy < 1.17."""
+    for bitGenerator in ("PCG64DXSM", "PCG64"):
+        try:
+            return numpy.random.Generator(
+                        getattr(numpy.random, bitGenerator)(seed))
+        except AttributeError:
+            pass
+    return numpy.random.RandomState(seed)
+
 class NumberGenerator(with_metaclass(ABCMeta, object)):
     """Base class for number generators.
     Generates numbers in the interval [0, 1].
-    Scaling is supposed to happen elsewhere."""
+    Scaling is supposed to happen elsewhere.
+
+    Uniform random numbers are drawn by :py:meth:`uniform` from a pool
+    common to all generators which is refilled in batches of
+    *bufferSize*. Unless seeded explicitly by :py:meth:`seed`, it is
+    seeded from the global numpy random state on first use."""
+    bufferSize = 4096
+    _rng = None    # random number generator shared by all subclasses
+    _buffer = None # pool of uniform random numbers in [0, 1)
+    _pos = 0       # index of the next unused number in the pool
 
     @classmethod
     @abstractmethod
     def get(cls, count = 1):
         raise NotImplementedError
 
+    @staticmethod
+    def seed(seed = None):
+        """Reseeds the random number generator common to all number
+        generators and discards previously drawn numbers."""
+        NumberGenerator._rng = makeRandomGenerator(seed)
+        NumberGenerator._buffer, NumberGenerator._pos = None, 0
+
+    @staticmethod
+    def uniform(count = 1):
+        """Returns *count* uniform random numbers in [0, 1)."""
+        if NumberGenerator._rng is None:
+            NumberGenerator.seed(numpy.random.randint(2**31))
+        rng, buf, pos = (NumberGenerator._rng, NumberGenerator._buffer,
+                         NumberGenerator._pos)
+        if buf is None or pos + count > len(buf):
+            if count > NumberGenerator.bufferSize:
+                return rng.uniform(size = count)
+            # refill with a new array, previously returned ones stay valid
+            buf = rng.uniform(size = NumberGenerator.bufferSize)
+            NumberGenerator._buffer, pos = buf, 0
+        NumberGenerator._pos = pos + count
+        return buf[pos:pos + count].copy()
+
     @classmethod
     def hdfWrite(self, hdf):
         hdf.writeAttributes(cls = classname(self))
@@ -30,7 +73,7 @@ class NumberGenerator(with_metaclass(ABCMeta, object)):
 class RandomUniform(NumberGenerator):
     @classmethod
     def get(cls, count = 1):
-        return numpy.random.uniform(size = count)
+        return cls.uniform(count)
 
 import sys
 
@@ -60,13 +103,10 @@ class RandomXorShiftUniform(NumberGenerator):
     @classmethod
     def getSeed(cls):
         """Generate seed using numpy."""
-        def rand32():
-            return numpy.random.random_integers(
-                        numpy.iinfo(numpy.uint32).min,
-                        numpy.iinfo(numpy.uint32).max)
-        seedData = numpy.zeros(cls._count, dtype = cls._dtype) # init empty array
-        for i in range(cls._count): # for each 64bit uint
-            seedData[i] = (lshift(rand32(), 32)) + rand32()
+        # upper and lower 32bit halves of all 64bit uints in one call
+        halves = numpy.random.randint(2**32, size = (2, cls._count),
+                                      dtype = numpy.int64).astype(cls._dtype)
+        seedData = lshift(halves[0], 32) + halves[1]
         # replacement:
         # return numpy.random.rand(cls._count).view(numpy.uint64)
         return seedData
@@ -172,7 +212,7 @@ class RandomExponential(NumberGenerator):
 
     @classmethod
     def get(cls, count = 1):
-        rs = 10**(numpy.random.uniform(cls.lower, cls.upper, count))
+        rs = 10**(cls.lower + (cls.upper - cls.lower) * cls.uniform(count))
         rs = (rs - 1) / (10**(cls.upper - cls.lower))
         return rs
 
@@ -61,11 +61,27 @@ from math import fabs as math_fabs
 from inspect import getmembers
 import numpy as np
 from utils import (isString, isNumber, isList, isMap, isSet, testfor,
-                   assertName, classname, classproperty, clip, isCallable)
+                   assertName, classname, clip, isCallable)
 from utils.mixedmethod import mixedmethod
 from utils.units import NoUnit
+from utils.jit import njit
 from .numbergenerator import NumberGenerator, RandomUniform
 
+# upper limit of displayed decimals, see ParameterFloat.setDecimals()
+_maxDecimals = sys.float_info.max_10_exp
+
+@njit(cache = True)
+def _scaleValues(values, lower, upper):
+    """Scales *values* in [0, 1) to [*lower*, *upper*) in place, the bounds
+    are scalars or vectors of the same length. Compiled by numba if
+    available, see utils.jit."""
+    values *= upper - lower
+    values += lower
+    return values
+
+# bound types for which generateValues() takes the scalar path
+_scalarTypes = (int, float, np.number)
+
 def generateValues(numberGenerator, defaultRange, lower, upper, count):
     # works with vectors of multiple bounds too
     vRange = defaultRange
@@ -73,18 +89,26 @@ def generateValues(numberGenerator, defaultRange, lower, upper, count):
         lower = vRange[0]
     if upper is None:
         upper = vRange[1]
-    vRange = (np.maximum(vRange[0], lower),
-              np.minimum(vRange[1], upper))
-    if isList(vRange[0]) and isList(vRange[1]):
-        assert len(vRange[0]) == len(vRange[1]), (
+    if isinstance(lower, _scalarTypes) and isinstance(upper, _scalarTypes):
+        # the common case, no need to go through numpy for clamping
+        lower, upper = float(max(vRange[0], lower)), float(min(vRange[1], upper))
+        values = np.asarray(numberGenerator.get(count), dtype = float)
+        return _scaleValues(values, lower, upper)
+    # numpy scalars for scalar bounds, arrays for vectors of bounds
+    lower, upper = np.maximum(vRange[0], lower), np.minimum(vRange[1], upper)
+    if lower.ndim and upper.ndim:
+        assert len(lower) == len(upper), (
                 "Provided value range is unsymmetrical!")
-    try: # update count to length of provided bound vectors
-        count = max(count, min([len(x) for x in vRange]))
-    except:
-        pass
-    values = numberGenerator.get(count)
-    # scale numbers to requested range
-    return values * (vRange[1] - vRange[0]) + vRange[0]
+    if lower.ndim or upper.ndim:
+        lower, upper = np.asarray(lower, dtype = float), np.asarray(
+                                                    upper, dtype = float)
+        # update count to length of provided bound vectors
+        count = max(count, lower.size, upper.size)
+    else:
+        lower, upper = float(lower), float(upper)
+    # a new array of random numbers, scaled to the requested range in place
+    values = np.asarray(numberGenerator.get(count), dtype = float)
+    return _scaleValues(values, lower, upper)
 
 class ParameterError(Exception):
     pass
@@ -165,6 +189,11 @@ class ParameterBase(object):
     def attributeNames(cls):
         """Returns an ordered list of attribute names considering multiple
         inheritance and maintaining its order."""
+        # merged once per class, the attributes are set up in class bodies
+        # and by factory() which creates a new class
+        cached = cls.__dict__.get("_mergedAttributeNames", None)
+        if cached is not None:
+            return list(cached)
         mergedAttrNames = []
         for baseCls in reversed(cls.__mro__):
             if not hasattr(baseCls, "_attributeNames"):
@@ -172,6 +201,7 @@ class ParameterBase(object):
             mergedAttrNames += [attrName
                                 for attrName in baseCls._attributeNames
                                 if attrName not in mergedAttrNames]
+        cls._mergedAttributeNames = tuple(mergedAttrNames)
         return mergedAttrNames
 
     @mixedmethod
@@ -285,10 +315,7 @@ class ParameterBase(object):
         """Set the value scaled to units used. For GUI display."""
         selforcls.setValue(newValue)
 
-    @classproperty
-    @classmethod
-    def dtype(cls):
-        return str
+    dtype = str # type of the value, fixed per class
 
     @classmethod
     def isDataType(cls, value):
@@ -305,11 +332,19 @@ class ParameterBase(object):
             self.dtype != other.dtype):
             return False
         try:
-            # avoid reference loops for objects of bound methods
-            xlst = ("onValueUpdate",)
-            equal = (self.attributes(exclude = xlst)
-                    == other.attributes(exclude = xlst))
-            return equal
+            # same as comparing attributes(), without building both
+            # dictionaries of values differing from the defaults
+            if (type(self).__mro__[1] is not type(other).__mro__[1]
+                or self.__doc__ != other.__doc__):
+                return False
+            for name in self.attributeNames():
+                # avoid reference loops for objects of bound methods
+                if name == "onValueUpdate":
+                    continue
+                value, otherValue = getattr(self, name)(), getattr(other, name)()
+                if value is not otherValue and value != otherValue:
+                    return False
+            return True
         except:
             return False
 
@@ -356,10 +391,7 @@ def _unpickleParameter(clsAttr, selfAttr):
     return param
 
 class ParameterBoolean(ParameterBase):
-    @classproperty
-    @classmethod
-    def dtype(cls):
-        return bool
+    dtype = bool
 
 class ParameterString(ParameterBase):
     """
@@ -385,10 +417,7 @@ class ParameterString(ParameterBase):
             return ()
         return self._valueRange
 
-    @classproperty
-    @classmethod
-    def dtype(cls):
-        return str
+    dtype = str
 
     @classmethod
     def isDataType(cls, value):
@@ -400,6 +429,7 @@ class ParameterNumerical(ParameterBase):
     # overridden as usual.
     ParameterBase.addAttributes(locals(), "valueRange", "suffix",
                   "stepping", "displayValues", "generator")
+    _displayValuesReverse = None # text to key, built in setDisplayValues()
 
     def hdfStoreAsMember(self):
         return (super(ParameterNumerical, self).hdfStoreAsMember()
@@ -422,9 +452,11 @@ class ParameterNumerical(ParameterBase):
                 "A value range is mandatory for a numerical parameter!")
         testfor(len(newRange) == 2, ValueRangeError,
                 "A value range has to consist of two values!")
-        testfor(all([isNumber(v) for v in newRange]), ValueRangeError,
+        minVal, maxVal = newRange
+        testfor(isNumber(minVal) and isNumber(maxVal), ValueRangeError,
                 "A value range has to consist of numbers only!")
-        minVal, maxVal = min(newRange), max(newRange)
+        if minVal > maxVal:
+            minVal, maxVal = maxVal, minVal
         # minVal = max(minVal, -sys.float_info.max) 
         # maxVal = min(maxVal,  sys.float_info.max)
         # avoid inf/nan showing up somewhere
@@ -457,12 +489,16 @@ class ParameterNumerical(ParameterBase):
             return
         testfor(isMap(newDisplayValues), DisplayValuesError,
                 "Expected a display value mapping of numbers to text!")
-        testfor(all([isNumber(v) for v in newDisplayValues.keys()]),
-            DisplayValuesError, "Display value keys have to be numbers!")
-        testfor(all([isString(s) for s in newDisplayValues.values()]),
-            DisplayValuesError, "Display values have to be text!")
-        # TODO: also add reverse lookup
+        # validate and build the reverse lookup in one pass
+        reverse = dict()
+        for key, text in newDisplayValues.items():
+            testfor(isNumber(key),
+                DisplayValuesError, "Display value keys have to be numbers!")
+            testfor(isString(text),
+                DisplayValuesError, "Display values have to be text!")
+            reverse[text] = key
         selforcls._displayValues = newDisplayValues
+        selforcls._displayValuesReverse = reverse
 
     @mixedmethod
     def setGenerator(selforcls, newGenerator):
@@ -504,10 +540,15 @@ class ParameterNumerical(ParameterBase):
         else:
             return selforcls._displayValues.get(key, default)
 
-    @classproperty
-    @classmethod
-    def dtype(cls):
-        return int
+    @mixedmethod
+    def displayValueKey(selforcls, text, default = None):
+        """Returns the key of the given display value text, the reverse of
+        displayValues(key)."""
+        if selforcls._displayValuesReverse is None:
+            return default
+        return selforcls._displayValuesReverse.get(text, default)
+
+    dtype = int
 
     @classmethod
     def isDataType(cls, value):
@@ -520,8 +561,13 @@ class ParameterNumerical(ParameterBase):
                 .format(*(self.valueRange()), sfx = self.suffix()))
 
     def generate(self, lower = None, upper = None, count = 1):
-        return generateValues(self.generator(), self.valueRange(),
-                              lower, upper, count).astype(self.dtype)
+        # called for each new contribution, reading the attributes directly
+        # skips the getter methods
+        vRange = self._valueRange
+        if vRange is None:
+            vRange = (None, None)
+        return generateValues(self._generator, vRange, lower, upper,
+                              count).astype(self.dtype, copy = False)
 
 class ParameterFloat(ParameterNumerical):
     ParameterNumerical.addAttributes(locals(), "decimals", unit = NoUnit())
@@ -580,14 +626,9 @@ class ParameterFloat(ParameterNumerical):
         else:
             start, end = selforcls._valueRange
             newDecimals = round(math_log10(math_fabs(end - start)))
-        newDecimals = max(newDecimals, 0)
-        newDecimals = min(newDecimals, sys.float_info.max_10_exp)
-        selforcls._decimals = int(newDecimals)
+        selforcls._decimals = int(min(max(newDecimals, 0), _maxDecimals))
 
-    @classproperty
-    @classmethod
-    def dtype(cls):
-        return float
+    dtype = float
 
     @classmethod
     def isDataType(cls, value):
@@ -597,6 +638,9 @@ class ParameterLog(ParameterFloat):
     """Used to select an UI input widget with logarithmic behaviour."""
     pass
 
+# removes whitespace from parameter names for their type names
+_whitespaceTable = str.maketrans("", "", ' \t\n\r')
+
 def factory(name, value, paramTypes = None, **kwargs):
     """
     Generates a new Parameter type derived from one of the predefined
@@ -642,8 +686,7 @@ def factory(name, value, paramTypes = None, **kwargs):
         clsdict['__doc__'] = description
     # create a new class/type with given name and base class
     # translate works different for unicode strings:
-    typeName = (str(name.title())
-                .translate(str.maketrans("", "", ' \t\n\r'))
+    typeName = (str(name.title()).translate(_whitespaceTable)
                 + "Parameter")
     NewType = None
     try:
@@ -77,6 +77,8 @@ def testParameterNumericalDisplayValues():
     for key, value in dv.items():
         assert key in p.displayValues()
         assert p.displayValues(key) == value
+        assert p.displayValueKey(value) == key
+    assert p.displayValueKey('four') is None
 
 def testParameterFloat():
     @raises(DecimalsError)
@@ -4,11 +4,8 @@
 from builtins import object
 
 class ModelData(object):
-    _cumInt = None
-    _vset = None
-    _wset = None
-    _sset = None
-    _numParams = 0
+    # created for each MC iteration, avoid the per instance __dict__
+    __slots__ = ("_cumInt", "_vset", "_wset", "_sset", "_numParams")
 
     def hdfWrite(self, hdf):
         hdf.writeMembers(self, "cumInt", "vset", "wset", "volumeFraction")
@@ -50,19 +47,22 @@ class ModelData(object):
         assert vset is not None
         assert wset is not None
         assert sset is not None
-        self._cumInt = cumInt.flatten()
-        self._vset = vset.flatten()
-        self._wset = wset.flatten()
-        self._sset = sset.flatten()
+        # views of the provided arrays where possible, no copies
+        self._cumInt = cumInt.ravel()
+        self._vset = vset.ravel()
+        self._wset = wset.ravel()
+        self._sset = sset.ravel()
         self._numParams = abs(numParams)
 
     def volumeFraction(self, scaling):
         """Returns the volume fraction based on the provided scaling factor to
         match this model data to the measured data. Assumes that the weights
         'self.wset' contain the scatterer volume squared."""
-        return (self.wset * scaling / self.vset).flatten()
+        volFrac = self.wset * scaling
+        volFrac /= self.vset # in place, no further temporary
+        return volFrac
 
 class SASModelData(ModelData):
-    pass
+    __slots__ = ()
 
 # vim: set ts=4 sts=4 sw=4 tw=0:
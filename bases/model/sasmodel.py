@@ -43,20 +43,38 @@ class SASModel(with_metaclass(ABCMeta, ScatteringModel)):
         """
         return self.volume()**(2 * self.compensationExponent)
 
-    def calcIntensity(self, data, compensationExponent = None):
+    def isSmeared(self, data):
+        """Returns True if the intensity for *data* is to be smeared."""
+        return ((data.config.smearing is not None) and
+                self.canSmear and
+                data.config.smearing.doSmear() and # serves same purpose as first
+                data.config.smearing.inputValid())
+
+    def intensityOptions(self, data):
+        # whether to smear and how depends on the data only
+        smear = self.isSmeared(data)
+        smearWeights = None
+        if smear:
+            smearWeights = data.config.smearing.integrationWeights()
+        return dict(smear = smear, smearWeights = smearWeights)
+
+    def calcIntensity(self, data, compensationExponent = None, smear = None,
+                      smearWeights = None):
         r"""Returns the intensity *I*, the volume :math:`v_{abs}` and the
         intensity weights *w* for a single parameter contribution over all *q*:
 
         :math:`I(q,r) = F^2(q,r) \cdot w(r)`
+
+        *smear* is determined by :py:meth:`isSmeared` if not provided,
+        *smearWeights* by :py:meth:`SmearingConfig.integrationWeights`.
         """
         v = self._volume(compensationExponent = compensationExponent)
         w = self._weight(compensationExponent = compensationExponent)
         s = self.surface()
 
-        if ((data.config.smearing is not None) and
-                self.canSmear and
-                data.config.smearing.doSmear() and # serves same purpose as first
-                data.config.smearing.inputValid()):
+        if smear is None:
+            smear = self.isSmeared(data)
+        if smear:
             # inputValid can be removed once more appropriate limits are set in GUI
 
             # TODO: fix after change from x0Fit to x0:
@@ -65,12 +83,11 @@ class SASModel(with_metaclass(ABCMeta, ScatteringModel)):
             # kansas = locs.shape
             # locs = locs.reshape((locs.size))
             ff = self._formfactor(locs) # .reshape(kansas)
-            qOffset, weightFunc = data.config.smearing.prepared
-#            import sys
-#            print >>sys.__stderr__, "prepared"
-#            print >>sys.__stderr__, unicode(data.config.smearing)
-            it = 2 * np.trapz(ff**2 * w * weightFunc,
-                    x = qOffset, axis = 1)
+            if smearWeights is None:
+                smearWeights = data.config.smearing.integrationWeights()
+            # the trapezoidal integration over the offsets of each q as
+            # a single matrix-vector product, without temporary arrays
+            it = (2. * w) * np.dot(ff * ff, smearWeights)
         else:
             # calculate their form factors
             ff = self._formfactor(data)
@@ -1,13 +1,13 @@
 # -*- coding: utf-8 -*-
 # bases/model/scatteringmodel.py
 
-from builtins import zip
+from builtins import zip, range
 import os.path
 import logging
 from abc import ABCMeta, abstractmethod
 from future.utils import with_metaclass
 
-from numpy import arange, zeros, argmax, hstack
+from numpy import zeros, argmax, hstack
 from utils import isList, mixedmethod, testfor, classname
 from bases.algorithm import AlgorithmBase
 from utils.parameter import isActiveFitParam
@@ -77,36 +77,90 @@ class ScatteringModel(with_metaclass(ABCMeta, AlgorithmBase)):
         """
         raise NotImplementedError
 
-    def calc(self, data, pset, compensationExponent = None):
-        """Calculates the total intensity and scatterer volume contributions
+    def intensityOptions(self, data):
+        """Returns keyword arguments for :py:meth:`calcIntensity` which
+        depend on the data only, not on the model parameters. They are
+        determined once for all contributions in
+        :py:meth:`calcContributions`."""
+        return dict()
+
+    def calcContributions(self, data, pset, compensationExponent = None):
+        """Calculates the intensity and scatterer volume of each contribution
         using the current model.
         *pset* number columns equals the number of active parameters.
-        Returns a ModelData object for a certain type of measurement.
+        Returns a tuple of a matrix with the intensities of one contribution
+        per row and the sets of volumes, weights and surfaces.
         """
         # remember parameter values
         params = self.activeParams()
         oldValues = [p() for p in params] # this sucks. But we dont want to lose the user provided value
-        cumInt = zeros(data.f.binnedData.shape) # cumulated intensities
-        vset = zeros(pset.shape[0])
-        wset = zeros(pset.shape[0])
-        sset = zeros(pset.shape[0])
+        count = pset.shape[0]
+        # intensities of each contribution, one per row
+        intensities = zeros((count,) + data.f.binnedData.shape)
+        vset = zeros(count)
+        wset = zeros(count)
+        sset = zeros(count)
+        calcIntensity = self.calcIntensity
+        options = self.intensityOptions(data)
+        setters = [p.setValue for p in params]
         # call the model for each parameter set explicitly
         # otherwise the model gets complex for multiple params incl. fitting
-        for i in arange(pset.shape[0]): # for each contribution
-            for p, v in zip(params, pset[i]): # for each fit param within
-                p.setValue(v)
+        for i in range(count): # for each contribution
+            for setValue, v in zip(setters, pset[i]): # for each fit param within
+                setValue(v)
             # result squared or not is model type dependent
-            it, vset[i], wset[i], sset[i] = self.calcIntensity(data,
-                          compensationExponent = compensationExponent)
-            # a set of intensities
-            cumInt += it
+            intensities[i], vset[i], wset[i], sset[i] = calcIntensity(data,
+                          compensationExponent = compensationExponent,
+                          **options)
         # restore previous parameter values
         for p, v in zip(params, oldValues):
             p.setValue(v)
+        return intensities, vset, wset, sset
+
+    # number of data points summed up at once in sumContributions(),
+    # a block of rows this wide fits into the CPU caches
+    sumTileSize = 4096
+
+    @classmethod
+    def sumContributions(cls, intensities, dtype = None):
+        """Returns the total intensity of a matrix of contributions
+        intensities as returned by :py:meth:`calcContributions`, summed up in
+        blocks of *sumTileSize* columns for data sets larger than that."""
+        numPoints = intensities.shape[-1]
+        if intensities.ndim != 2 or numPoints <= cls.sumTileSize:
+            return intensities.sum(axis = 0, dtype = dtype)
+        cumInt = zeros(numPoints, dtype = dtype or intensities.dtype)
+        for start in range(0, numPoints, cls.sumTileSize):
+            tile = slice(start, start + cls.sumTileSize)
+            intensities[:, tile].sum(axis = 0, dtype = dtype,
+                                     out = cumInt[tile])
+        return cumInt
+
+    # number of contributions calculated at once in calc(), limits the
+    # memory of the intermediate intensities to this many rows
+    calcChunkSize = 32
+
+    def calc(self, data, pset, compensationExponent = None):
+        """Calculates the total intensity and scatterer volume contributions
+        using the current model.
+        *pset* number columns equals the number of active parameters.
+        Returns a ModelData object for a certain type of measurement.
+        The contributions are calculated in chunks of *calcChunkSize* and
+        accumulated, the intensity of each one is not kept.
+        """
+        count = pset.shape[0]
+        cumInt = zeros(data.f.binnedData.shape)
+        vset, wset, sset = zeros(count), zeros(count), zeros(count)
+        for start in range(0, count, self.calcChunkSize):
+            chunk = slice(start, start + self.calcChunkSize)
+            intensities, vset[chunk], wset[chunk], sset[chunk] = (
+                self.calcContributions(data, pset[chunk],
+                            compensationExponent = compensationExponent))
+            cumInt += self.sumContributions(intensities)
         return self.getModelData(cumInt, vset, wset, sset)
 
     def getModelData(self, cumInt, vset, wset, sset):
-        return self.modelDataType()(cumInt.flatten(), vset, wset, sset,
+        return self.modelDataType()(cumInt, vset, wset, sset,
                                     self.activeParamCount())
 
     @abstractmethod
@@ -119,8 +173,9 @@ class ScatteringModel(with_metaclass(ABCMeta, AlgorithmBase)):
         """Generates a set of parameters for this model using the predefined
         Parameter.generator. Allows for different random number distributions.
         """
-        lst = zeros((count, self.activeParamCount()))
-        for idx, param in enumerate(self.activeParams()):
+        params = self.activeParams()
+        lst = zeros((count, len(params)))
+        for idx, param in enumerate(params):
             # generate numbers in different range for each active parameter
             if isActiveFitParam(param):
                 lst[:, idx] = param.generate(count = count)
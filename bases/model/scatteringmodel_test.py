@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 # bases/model/scatteringmodel_test.py
 
+from __future__ import print_function
 from bases.model import SASModel
 from utils.parameter import FitParameter
 
@@ -21,8 +22,8 @@ def testSerialization():
     a = DummyModel.factory()()
     data = pickle.dumps(a)
     a2 = pickle.loads(data)
-    print a
-    print a2
+    print(a)
+    print(a2)
     assert a == a2
 
 # vim: set ts=4 sts=4 sw=4 tw=0:
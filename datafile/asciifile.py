@@ -4,7 +4,7 @@
 from __future__ import absolute_import # PEP328
 import codecs
 from abc import ABCMeta, abstractmethod
-from numpy import array as np_array
+from numpy import array as np_array, ndarray
 from datafile import DataFile
 from utils.error import FileError
 from utils import isString, isWindows, mcopen
@@ -31,6 +31,15 @@ class AsciiFile(with_metaclass(ABCMeta, DataFile)):
 
     @classmethod
     def formatData(cls, data, **kwargs):
+        if (isinstance(data, ndarray) and data.ndim == 2
+            and data.dtype.kind in "fiu"):
+            # purely numerical: a single format string for all rows, no
+            # fallback to plain formatting of single values required
+            rowFormat = cls.separator.join([cls.valueFormat.replace(
+                                                "{0", "{" + str(i), 1)
+                                            for i in range(data.shape[1])])
+            return cls.newline.join([rowFormat.format(*row)
+                                     for row in data.tolist()])
         return cls.newline.join([cls.formatRow(row, **kwargs)
                                  for row in data])
 
@@ -76,6 +76,13 @@ class DataObj(with_metaclass(ABCMeta, type('NewBase', (DataSet, DisplayMixin), {
         self._initMask()
         self._propagateMask()
 
+    @property
+    def dataVectors(self):
+        """All data vectors present in this data set, the measurement
+        vector first."""
+        return tuple(vec for vec in (self._f, self._x0, self._x1, self._x2)
+                     if isinstance(vec, DataVector))
+
     @classproperty
     @classmethod
     def sourceName(cls):
@@ -213,7 +220,7 @@ class DataObj(with_metaclass(ABCMeta, type('NewBase', (DataSet, DisplayMixin), {
             self.f.siDataU = siDataUMin
         else:
             upd = np.maximum(self.f.unit.toSi(self.f.rawDataU), siDataUMin)
-            count = sum(upd <= siDataUMin)
+            count = np.count_nonzero(upd <= siDataUMin)
             if count > 0:
                 logging.warning("Minimum uncertainty of {}% intensity set "
                                 "for {} data points.".format(
@@ -223,7 +230,7 @@ class DataObj(with_metaclass(ABCMeta, type('NewBase', (DataSet, DisplayMixin), {
                          "of {}% intensity.".format(minUncertaintyPercent))
             self.f.siDataU = upd
         # reset invalid uncertainties to np.inf
-        invInd = (True - np.isfinite(self.f.siDataU))
+        invInd = ~np.isfinite(self.f.siDataU)
         self.f.siDataU[invInd] = np.inf
 
     @property
@@ -244,47 +251,45 @@ class DataObj(with_metaclass(ABCMeta, type('NewBase', (DataSet, DisplayMixin), {
         self._validMask = np.isfinite(self.f.siData)
 
     def _propagateMask(self):
-        # store
-        validIndices = np.argwhere(self._validMask)[:,0]
+        # store, the same index array is shared by all vectors
+        validIndices = np.flatnonzero(self._validMask)
         # pass on all valid indices to the parameters
-        self.f.validIndices = validIndices
-        self.x0.validIndices = validIndices
-        if isinstance(self.x1, DataVector):
-            self.x1.validIndices = validIndices
-        if isinstance(self.x2, DataVector):
-            self.x2.validIndices = validIndices
+        for vec in self.dataVectors:
+            vec.validIndices = validIndices
         # add onMaskUpdate() or validIndicesUpdated() callback here
 
     def _applyFMasks(self):
         # Optional masking of negative intensity
-        if self.config.fMaskZero():
-            # FIXME: compare with machine precision (EPS)?
-            self._validMask &= (self.f.siData != 0.0)
+        fData = self.f.siData
         if self.config.fMaskNeg():
-            self._validMask &= (self.f.siData > 0.0)
+            self._validMask &= (fData > 0.0) # excludes zero as well
+        elif self.config.fMaskZero():
+            # FIXME: compare with machine precision (EPS)?
+            self._validMask &= (fData != 0.0)
 
     def _applyLimits(self):
         # clip to q bounds
-        self._validMask &= (self.x0.siData >= self.config.x0Low())
-        self._validMask &= (self.x0.siData <= self.config.x0High())
+        x0Low, x0High = self.config.x0Low(), self.config.x0High()
+        self._validMask &= (self.x0.siData >= x0Low)
+        self._validMask &= (self.x0.siData <= x0High)
         # clip to psi bounds
         if not self.is2d:
             return
         # -> is it important to use '>' here, instead of '>=' for x0?
-        self._validMask &= (self.x1.siData >  self.config.x1Low())
-        self._validMask &= (self.x1.siData <= self.config.x1High())
+        x1Low, x1High = self.config.x1Low(), self.config.x1High()
+        self._validMask &= (self.x1.siData >  x1Low)
+        self._validMask &= (self.x1.siData <= x1High)
 
-    def _onFMasksUpdate(self, *args):
+    def _updateMask(self, *args):
+        """Rebuilds the mask of valid data points in place and passes the
+        resulting indices on to all data vectors."""
         self._initMask()
         self._applyFMasks()
         self._applyLimits()
         self._propagateMask()
 
-    def _onLimitsUpdate(self, *args):
-        self._initMask()
-        self._applyFMasks()
-        self._applyLimits()
-        self._propagateMask()
+    _onFMasksUpdate = _updateMask
+    _onLimitsUpdate = _updateMask
 
     def _reBin(self):
         """Rebinning method, to be run (f.ex.) upon every "Start" buttonpress.
@@ -316,15 +321,17 @@ class DataObj(with_metaclass(ABCMeta, type('NewBase', (DataSet, DisplayMixin), {
                 np.log10(sanX.max() + np.diff(sanX)[-1]/100.), #include last point
                 nBin + 1)
 
+        # sanitize once, not per bin
+        sanF, sanFU = self.f.sanitized, self.f.sanitizedU
         # loop over bins:
         for bini in range(nBin):
             fBin[bini], fuBin[bini], x0Bin[bini] = None, None, None # default
             fMask = ((sanX >= xEdges[bini]) & (sanX < xEdges[bini + 1]))
-            fInBin, fuInBin = self.f.sanitized[fMask], self.f.sanitizedU[fMask]
+            fInBin, fuInBin = sanF[fMask], sanFU[fMask]
             fInBinDDoF = 0
             if len(fInBin) > 1: # prevent division by zero in numpy.std()
                 fInBinDDoF = 1
-            x0InBin = self.x0.sanitized[fMask]
+            x0InBin = sanX[fMask]
             if fMask.sum() == 1:
                 fBin[bini], fuBin[bini], x0Bin[bini] = fInBin, fuInBin, x0InBin
                 validMask[bini] = True
@@ -338,8 +345,7 @@ class DataObj(with_metaclass(ABCMeta, type('NewBase', (DataSet, DisplayMixin), {
                         )
 
         # remove empty bins:
-        validi = (True - np.isnan(fBin))
-        validi[np.argwhere(validMask != True)] = False
+        validi = ~np.isnan(fBin) & validMask
         # store values:
         self.f.binnedData, self.f.binnedDataU = fBin[validi], fuBin[validi]
         self.x0.binnedData = x0Bin[validi] # self.x0.unit.toDisplay(x0Bin[validi])
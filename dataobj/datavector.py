@@ -52,13 +52,14 @@ class DataVector(object):
             assert indices.max() <= self.siData.size
         self._validIndices = indices
         if len(indices):
-            self._limit = [self.sanitized.min(), self.sanitized.max()]
+            sanitized = self.sanitized
+            self._limit = [sanitized.min(), sanitized.max()]
         else:
             self._limit = [0., 0.]
 
     @property
     def sanitized(self):
-        return self.siData.copy()[self.validIndices]
+        return self.siData[self.validIndices] # indexing returns a copy
 
     @sanitized.setter
     def sanitized(self, val):
@@ -69,7 +70,7 @@ class DataVector(object):
     def sanitizedU(self):
         if self.siDataU is None:
             return None
-        return self.siDataU.copy()[self.validIndices]
+        return self.siDataU[self.validIndices]
 
     @sanitizedU.setter
     def sanitizedU(self, val):
@@ -66,6 +66,17 @@ class SmearingConfig(with_metaclass(ABCMeta, AlgorithmBase)):
     def prepared(self):
         return self._qOffset, self._weights
 
+    def integrationWeights(self):
+        """Returns the prepared weights multiplied by the coefficients of the
+        trapezoidal rule over *qOffset*. Their dot product with values at
+        *qOffset* equals np.trapz(values * weights, x = qOffset)."""
+        qOffset, weights = self.prepared
+        halfSteps = np.diff(qOffset) * .5
+        coefficients = np.zeros_like(qOffset)
+        coefficients[:-1] += halfSteps
+        coefficients[1:] += halfSteps
+        return weights * coefficients
+
     def __str__(self):
         s = [str(id(self)) + " " + super(SmearingConfig, self).__str__()]
         s.append("  qOffset: {}".format(self.qOffset))
@@ -116,7 +127,8 @@ class TrapezoidSmearing(SmearingConfig):
         pdf = x * 0.
         pdf[x < c] = 1.
         if d > c:
-            pdf[(c <= x) & (x < d)] = (1./(d - c)) * (d - x[(c <= x) & (x < d)])
+            slope = (c <= x) & (x < d)
+            pdf[slope] = (1./(d - c)) * (d - x[slope])
         norm = 1./(d + c)
         pdf *= norm
         return pdf, norm
@@ -37,7 +37,8 @@ class OptimizationWidget(AlgorithmWidget):
             widgetType = AdvancedSettings, widgets = tuple(self.makeWidgets(
                 "numContribs", "compensationExponent", 
                 "findBackground", "maxIterations", "showIncomplete",
-                "seriesStats")))
+                "seriesStats", "numCores", "numPrefetch",
+                "singlePrecision")))
         hlayout.addWidget(self.defaults)
         hlayout.addWidget(self.advanced)
         self.sigValueChanged.connect(self.advanced.updateWidgets)
@@ -10,18 +10,38 @@ import os
 import importlib
 
 import PySide
-from PySide import QtGui, QtCore, QtSvg, QtXml
+from PySide import QtGui, QtCore
 from PySide import __path__ as PySidePath
 
+# QtCore and QtGui are needed by almost every widget and are imported by
+# their plain names elsewhere ('from QtCore import Qt'), register them now
 try:
     sys.modules["QtGui"] = QtGui
     sys.modules["QtCore"] = QtCore
-    sys.modules["QtSvg"] = QtSvg
-    sys.modules["QtXml"] = QtXml
 except ImportError: # works around sphinx docs error
     raise
     pass
 
+# modules loaded on first access only, by 'from gui.qt import QtSvg'
+_lazyModules = ("QtSvg", "QtXml")
+
+def _loadModule(name):
+    module = importlib.import_module("." + name, PySide.__name__)
+    sys.modules[name] = module
+    setattr(sys.modules[__name__], name, module)
+    return module
+
+def __getattr__(name):
+    """Imports the remaining Qt modules lazily (PEP 562)."""
+    if name in _lazyModules:
+        return _loadModule(name)
+    raise AttributeError("module {0!r} has no attribute {1!r}"
+                         .format(__name__, name))
+
+if sys.version_info < (3, 7): # no module level __getattr__
+    for name in _lazyModules:
+        _loadModule(name)
+
 def pluginDirs():
     libpath = PySidePath
     for pdir in [os.path.join(p, "plugins") for p in libpath]:
@@ -8,8 +8,10 @@ File dialogs and convenience functions.
 
 from __future__ import absolute_import # PEP328
 import os
+import sys
+from functools import lru_cache
 from gui.qt import QtGui
-from QtGui import QFileDialog, QDialog
+QFileDialog, QDialog = QtGui.QFileDialog, QtGui.QDialog
 from utils import isList
 
 def fileDialogType():
@@ -17,10 +19,16 @@ def fileDialogType():
         return QDialog
     return QFileDialog
 
+@lru_cache(maxsize = 64)
+def _makeFilter(filterTuple):
+    return ";;".join(filterTuple)
+
 def makeFilter(filterList):
+    """Joins the given file name filters into the string expected by
+    QFileDialog, the same filter lists are joined once only."""
     if filterList is None:
         return ""
-    return ";;".join(filterList)
+    return _makeFilter(tuple(filterList))
 
 def fileDialog(parent, labeltext, path, directory = False,
                readOnly = True):
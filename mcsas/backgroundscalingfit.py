@@ -5,8 +5,72 @@
 from __future__ import absolute_import # PEP328
 from __future__ import division
 from builtins import object
+import numpy as np
 from scipy import optimize
 from bases.model import SASModel
+from utils.jit import njit
+
+# Numerical kernels of the chi-squared calculation, called for every MC
+# iteration. Compiled by numba if available, see utils.jit.
+# The uncertainties enter as precomputed reciprocal weights *invErr* and
+# *invErrSqr*, avoiding a division for each data point.
+# Sums are accumulated in double precision, also for single precision input,
+# the MC acceptance test compares chi-squared values differing only slightly.
+
+@njit(cache = True, fastmath = True)
+def _chi(sc, dataMeas, invErr, dataCalc):
+    return (dataMeas - sc[0] * dataCalc - sc[1]) * invErr
+
+@njit(cache = True, fastmath = True)
+def _chiNoBg(sc, dataMeas, invErr, dataCalc):
+    return (dataMeas - sc[0] * dataCalc) * invErr
+
+@njit(cache = True, fastmath = True)
+def _chiSqr(dataMeas, invErrSqr, dataCalc):
+    diff = dataMeas - dataCalc
+    return np.sum(diff * diff * invErrSqr, dtype = np.float64) / len(dataMeas)
+
+@njit(cache = True, fastmath = True)
+def _sumSqrDiff(dataMeas, dataCalc):
+    diff = dataMeas - dataCalc
+    return np.sum(diff * diff, dtype = np.float64)
+
+@njit(cache = True, fastmath = True)
+def _chiSqrScaled(sc, dataMeas, invErrSqr, dataCalc):
+    """Reduced chi-squared and sum of squared differences of the measured
+    and the scaled calculated data, fused into a single pass."""
+    diff = dataMeas - (dataCalc * sc[0] + sc[1])
+    sqrDiff = diff * diff
+    return (np.sum(sqrDiff * invErrSqr, dtype = np.float64) / len(dataMeas),
+            np.sum(sqrDiff, dtype = np.float64))
+
+@njit(cache = True, fastmath = True)
+def _linearScalingBg(dataMeas, invErrSqr, dataCalc, invErrSqrSum, measWeightedSum):
+    """Solves the normal equations of the weighted linear least squares
+    problem for scaling and background. Returns both and the determinant
+    of the 2x2 system, which is zero if the system is singular.
+    The sums of the weights and the weighted measured values do not depend
+    on the model, they are passed in precomputed."""
+    calcWeighted = dataCalc * invErrSqr
+    aa, ab, bb = np.dot(calcWeighted, dataCalc), calcWeighted.sum(), invErrSqrSum
+    ay, by = np.dot(calcWeighted, dataMeas), measWeightedSum
+    # solve in double precision, the determinant is prone to cancellation
+    aa, ab, bb = np.float64(aa), np.float64(ab), np.float64(bb)
+    ay, by = np.float64(ay), np.float64(by)
+    det = aa * bb - ab * ab
+    if det == 0.:
+        return 0., 0., det
+    return (bb * ay - ab * by) / det, (aa * by - ab * ay) / det, det
+
+@njit(cache = True, fastmath = True)
+def _linearScaling(dataMeas, invErrSqr, dataCalc, invErrSqrSum, measWeightedSum):
+    """Least squares scaling factor without background, with the
+    denominator as determinant."""
+    calcWeighted = dataCalc * invErrSqr
+    aa = np.float64(np.dot(calcWeighted, dataCalc))
+    if aa == 0.:
+        return 0., 0., aa
+    return np.float64(np.dot(calcWeighted, dataMeas)) / aa, 0., aa
 
 class BackgroundScalingFit(object):
     """
@@ -26,8 +90,8 @@ class BackgroundScalingFit(object):
     :arg sc: A 2-element array of initial guesses for scaling
              factor and background
     :arg ver: *(optional)* Can be set to 1 for old version, more robust
-              but slow, default 2 for new version,
-              10x faster than version 1, requires decent starting values
+              but slow, default 2 for new version which solves the
+              linear least squares problem directly
     :arg outputIntensity: *(optional)* Return the scaled intensity as
                           third output argument, default: False
     :arg background: *(optional)* Enables a flat background contribution,
@@ -38,82 +102,198 @@ class BackgroundScalingFit(object):
               chi-squared value.
     """
     _findBackground = None # True: find optimal background as well
+    _dataKey = None  # the binned data the arrays below were prepared for
+    _dataMeas = None # measured values, 1-D contiguous
+    _dataErr = None  # uncertainties of measured values, 1-D contiguous
+    _invErr = None   # reciprocal uncertainties
+    _invErrSqr = None # squared reciprocal uncertainties
+    _errSqrSum = None # sum of squared uncertainties
+    _invErrSqrSum = None # sum of the weights of the linear least squares
+    _measWeightedSum = None # sum of the weighted measured values
+    _dataScaled = None # buffer for the scaled model data of each residual
 
     def __init__(self, findBackground, *args):
         self._findBackground = bool(findBackground)
 
+    @staticmethod
+    def _sameArray(cached, current):
+        if cached is None or current is None:
+            return cached is current
+        return cached.shape == current.shape and np.array_equal(cached, current)
+
+    def prepareData(self, data, dtype = float):
+        """Returns the measured values and their uncertainties of *data* as
+        contiguous 1-D arrays of floating point type *dtype*. They are
+        prepared once and reused for each subsequent call with the same
+        binned values and type, as well as the weights derived from the
+        uncertainties. The binned values are compared, not the data set:
+        masking or rebinning the same data set prepares them again.
+        """
+        dtype = np.dtype(dtype)
+        binned, binnedU = data.f.binnedData, data.f.binnedDataU
+        if (self._dataKey is None or dtype != self._dataMeas.dtype
+            or not self._sameArray(self._dataKey[0], binned)
+            or not self._sameArray(self._dataKey[1], binnedU)):
+            dataMeas = np.ascontiguousarray(binned, dtype = float).ravel()
+            if binnedU is not None:
+                dataErr = np.array(binnedU, dtype = float).ravel()
+                dataErr[dataErr == 0.0] = 1. # prevent division by zero
+            else:
+                dataErr = np.ones_like(dataMeas)
+            invErr = 1. / dataErr
+            # weights are derived in double precision before conversion
+            self._invErr = invErr.astype(dtype)
+            self._invErrSqr = (invErr * invErr).astype(dtype)
+            self._errSqrSum = (dataErr * dataErr).sum()
+            self._dataMeas = dataMeas.astype(dtype)
+            self._invErrSqrSum = self._invErrSqr.sum()
+            self._measWeightedSum = np.dot(self._invErrSqr, self._dataMeas)
+            self._dataErr = dataErr.astype(dtype)
+            # copies, the data set may change its arrays in place
+            self._dataKey = (np.array(binned),
+                             None if binnedU is None else np.array(binnedU))
+            # same type as the product of model data and scaling factor
+            self._dataScaled = np.empty_like(dataMeas,
+                            dtype = np.result_type(dtype, np.float64(0.)))
+        return self._dataMeas, self._dataErr
+
     @staticmethod
     def chi(sc, dataMeas, dataErr, dataCalc):
         """Chi calculation, difference of measured and calculated signal.
         """
-        return (dataMeas - sc[0] * dataCalc - sc[1]) / dataErr
+        return _chi(sc, dataMeas, 1. / dataErr, dataCalc)
     
     @staticmethod
     def chiNoBg(sc, dataMeas, dataErr, dataCalc):
         """Chi calculation, difference of measured and calculated signal,
         scaling only, no backgrund.
         """
-        return (dataMeas - sc[0] * dataCalc) / dataErr
+        return _chiNoBg(sc, dataMeas, 1. / dataErr, dataCalc)
 
     @staticmethod
     def chiSqr(dataMeas, dataErr, dataCalc):
         """Reduced Chi-squared calculation, size of parameter-space not taken
         into account; for data with known intError.
         """
-        return sum(((dataMeas - dataCalc)/dataErr)**2) / len(dataMeas)
+        return _chiSqr(dataMeas, 1. / dataErr**2, dataCalc)
 
     @staticmethod
     def aGoFsAlpha(dataMeas, dataErr, dataCalc):
         """The alternative Goodness-of-Fit value without alpha, i.e. multiplied
         by alpha, according to [Henn 2016]
         ( http://dx.doi.org/10.1107/S2053273316013206 )."""
-        return sum((dataMeas - dataCalc)**2) / sum(dataErr**2)
+        return (_sumSqrDiff(dataMeas, dataCalc)
+                / np.sum(dataErr * dataErr, dtype = np.float64))
 
-    def dataScaled(self, data, sc):
+    def dataScaled(self, data, sc, out = None):
         """Returns the input data scaled by the provided factor and background
-        level applied if requested."""
+        level applied if requested. Stores the result in *out* if provided."""
+        out = np.multiply(data, sc[0], out = out)
         if self._findBackground:
-            return (data * sc[0]) + sc[1] # apply background on request
-        # else:
-        return (data * sc[0])
+            out += sc[1] # apply background on request
+        return out
 
-    def fitLM(self, dataMeas, dataErr, dataCalc, sc):
-        func = self.chiNoBg
+    def fitLM(self, dataMeas, dataCalc, sc):
+        func = _chiNoBg
+        # the residuals are linear in scaling and background, their
+        # derivatives are constant: one row per parameter (col_deriv)
+        jacobian = np.zeros((len(sc), len(dataMeas)))
+        jacobian[0] = -dataCalc * self._invErr
         if self._findBackground:
-            func = self.chi
-        sc, success = optimize.leastsq(func, sc, args = (dataMeas, dataErr, dataCalc),
-                                       full_output = False)
+            func = _chi
+            jacobian[1] = -self._invErr
+        sc, success = optimize.leastsq(func, sc,
+                                       args = (dataMeas, self._invErr, dataCalc),
+                                       Dfun = lambda *args: jacobian,
+                                       col_deriv = True, full_output = False)
         return sc
 
-    def fitSimplex(self, dataMeas, dataErr, dataCalc, sc):
+    def fitLinear(self, dataMeas, dataCalc, sc):
+        """Scaling and background are linear parameters of the model, the
+        weighted least squares problem is solved directly. Falls back to
+        :py:meth:`fitLM` if the system is singular."""
+        func = _linearScaling
+        if self._findBackground:
+            func = _linearScalingBg
+        scaling, background, det = func(dataMeas, self._invErrSqr, dataCalc,
+                            self._invErrSqrSum, self._measWeightedSum)
+        if not (det > 0. and np.isfinite(det)):
+            return self.fitLM(dataMeas, dataCalc, sc)
+        return np.array((scaling, background))
+
+    def fitSimplex(self, dataMeas, dataCalc, sc):
+        invErrSqr, dataScaled = self._invErrSqr, self._dataScaled
         def residual(xsc):
-            return self.chiSqr(dataMeas, dataErr, self.dataScaled(dataCalc, xsc))
+            return _chiSqr(dataMeas, invErrSqr,
+                           self.dataScaled(dataCalc, xsc, out = dataScaled))
         sc = optimize.fmin(residual, sc, full_output = False, disp = 0)
         return sc
 
     def calc(self, data, modelData, sc, ver = 2):
-        dataMeas = data.f.binnedData.flatten()
-        dataErr = 1.
-        if data.f.binnedDataU is not None:
-            dataErr = data.f.binnedDataU.flatten()
-            dataErr[dataErr == 0.0] = 1. # prevent division by zero
         dataCalc = modelData.chisqrInt
+        dataMeas, dataErr = self.prepareData(data, dataCalc.dtype)
         if not len(dataMeas): # all data filtered
             return sc, 1., dataCalc, 1.
 
         # different data fit approaches: speed vs. stability (?)
         if ver == 2:
-            sc = self.fitLM(dataMeas, dataErr, dataCalc, sc)
+            sc = self.fitLinear(dataMeas, dataCalc, sc)
         else:
-            sc = self.fitSimplex(dataMeas, dataErr, dataCalc, sc)
+            sc = self.fitSimplex(dataMeas, dataCalc, sc)
 
         if not self._findBackground:
             sc[1] = 0.0
         # calculate convergence value
-        conval = self.chiSqr(dataMeas, dataErr, self.dataScaled(dataCalc, sc))
-        aGoFs = self.aGoFsAlpha(dataMeas, dataErr, self.dataScaled(dataCalc, sc))
+        # background is zero if not requested
+        conval, sumSqrDiff = _chiSqrScaled(sc, dataMeas, self._invErrSqr,
+                                           dataCalc)
+        # alternative goodness of fit, without alpha
+        aGoFs = sumSqrDiff / self._errSqrSum
         # multiplied by the reciprocal of alpha
         aGoFs *= len(dataMeas) / (len(dataMeas) - modelData.numParams )
         return sc, conval, dataCalc, aGoFs
 
+    def calcBatch(self, data, dataCalcs, sc, numParams):
+        """Optimizes scaling and background for each row of *dataCalcs*
+        independently, solving the linear least squares problems of all rows
+        at once like :py:meth:`fitLinear`. *sc* is the initial guess for
+        rows which require the iterative fit.
+        Returns the scaling factors and backgrounds in rows of an array, the
+        reduced chi-squared and the alternative goodness of fit values of
+        all rows."""
+        dataMeas, dataErr = self.prepareData(data, dataCalcs.dtype)
+        count = len(dataCalcs)
+        scs = np.zeros((count, 2))
+        if not len(dataMeas): # all data filtered
+            return scs, np.ones(count), np.ones(count)
+
+        # normal equations of all rows, see _linearScalingBg()
+        calcWeighted = dataCalcs * self._invErrSqr
+        aa = np.sum(calcWeighted * dataCalcs, axis = 1, dtype = np.float64)
+        ay = calcWeighted.dot(dataMeas).astype(np.float64)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            if self._findBackground:
+                ab = np.sum(calcWeighted, axis = 1, dtype = np.float64)
+                bb = np.float64(self._invErrSqrSum)
+                by = np.float64(self._measWeightedSum)
+                det = aa * bb - ab * ab
+                scs[:, 0] = (bb * ay - ab * by) / det
+                scs[:, 1] = (aa * by - ab * ay) / det
+            else:
+                det = aa
+                scs[:, 0] = ay / aa
+        for i in np.flatnonzero(~((det > 0.) & np.isfinite(det))):
+            scs[i] = self.fitLM(dataMeas, dataCalcs[i], np.array(sc))
+        if not self._findBackground:
+            scs[:, 1] = 0.0
+
+        # convergence values of all rows, see _chiSqrScaled()
+        diff = dataMeas - (dataCalcs * scs[:, :1] + scs[:, 1:])
+        sqrDiff = diff * diff
+        convals = (np.sum(sqrDiff * self._invErrSqr, axis = 1, dtype = np.float64)
+                   / len(dataMeas))
+        aGoFs = np.sum(sqrDiff, axis = 1, dtype = np.float64) / self._errSqrSum
+        aGoFs *= len(dataMeas) / (len(dataMeas) - numParams)
+        return scs, convals, aGoFs
+
 # vim: set ts=4 sts=4 sw=4 tw=0:
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# mcsas/backgroundscalingfit_test.py
+
+from __future__ import absolute_import # PEP328
+from builtins import object
+import numpy
+from mcsas.backgroundscalingfit import BackgroundScalingFit
+
+class DummyVector(object):
+    def __init__(self, binnedData, binnedDataU):
+        self.binnedData, self.binnedDataU = binnedData, binnedDataU
+
+class DummyData(object):
+    """Provides the measured values the way SASData does."""
+    def __init__(self, binnedData, binnedDataU = None):
+        self.f = DummyVector(binnedData, binnedDataU)
+
+def getFitData(count = 100, seed = 1):
+    rs = numpy.random.RandomState(seed)
+    dataCalc = rs.uniform(.5, 2., count)
+    dataErr = rs.uniform(.01, .1, count)
+    dataMeas = dataCalc * 3.2 + .7 + rs.normal(scale = dataErr)
+    return dataMeas, dataErr, dataCalc
+
+def compareWithLM(findBackground, withErrors):
+    dataMeas, dataErr, dataCalc = getFitData()
+    if not withErrors:
+        dataErr = None
+    bgFit = BackgroundScalingFit(findBackground)
+    dataMeas, dummy = bgFit.prepareData(DummyData(dataMeas, dataErr))
+    sc = numpy.array((1., 0.))
+    linear = bgFit.fitLinear(dataMeas, dataCalc, sc)
+    iterative = bgFit.fitLM(dataMeas, dataCalc, sc)
+    if not findBackground: # fitLM keeps the initial background
+        assert linear[1] == 0.
+        linear[1] = iterative[1]
+    assert numpy.allclose(linear, iterative, rtol = 1e-6, atol = 1e-9)
+
+def testFitLinear():
+    """The closed form solution matches the iterative fit."""
+    for findBackground in True, False:
+        for withErrors in True, False:
+            compareWithLM(findBackground, withErrors)
+
+def testFitLinearSingular():
+    """A singular system falls back to the iterative fit."""
+    dataMeas, dataErr, dataCalc = getFitData()
+    dataCalc = numpy.zeros_like(dataCalc)
+    bgFit = BackgroundScalingFit(True)
+    dataMeas, dummy = bgFit.prepareData(DummyData(dataMeas, dataErr))
+    sc = numpy.array((2., 0.))
+    linear = bgFit.fitLinear(dataMeas, dataCalc, sc)
+    assert numpy.allclose(linear, bgFit.fitLM(dataMeas, dataCalc, sc))
+    # only the background is determined, the weighted mean
+    weights = 1. / dataErr**2
+    assert numpy.allclose(linear[1], (dataMeas * weights).sum() / weights.sum())
+
+def testPrepareDataRebinned():
+    """Prepared data follows changed binned values of the same data set."""
+    dataMeas, dataErr, dummy = getFitData()
+    data = DummyData(dataMeas.copy(), dataErr.copy())
+    bgFit = BackgroundScalingFit(True)
+    prepared = bgFit.prepareData(data)
+    assert bgFit.prepareData(data)[0] is prepared[0] # reused
+    # rebinned to fewer values
+    data.f.binnedData, data.f.binnedDataU = dataMeas[::2], dataErr[::2].copy()
+    assert numpy.array_equal(bgFit.prepareData(data)[0], dataMeas[::2])
+    # changed in place
+    data.f.binnedDataU *= 2.
+    assert numpy.allclose(bgFit.prepareData(data)[1], 2. * dataErr[::2])
+    data.f.binnedDataU = None
+    assert numpy.array_equal(bgFit.prepareData(data)[1],
+                             numpy.ones_like(dataMeas[::2]))
+
+class DummyModelData(object):
+    def __init__(self, chisqrInt, numParams = 1):
+        self.chisqrInt, self.numParams = chisqrInt, numParams
+
+def compareBatch(findBackground):
+    dataMeas, dataErr, dataCalc = getFitData()
+    data = DummyData(dataMeas, dataErr)
+    rs = numpy.random.RandomState(2)
+    dataCalcs = dataCalc * rs.uniform(.5, 1.5, (5, 1))
+    dataCalcs[2] = 0. # singular, fitted iteratively
+    sc = numpy.array((1., 0.))
+    batchFit, rowFit = (BackgroundScalingFit(findBackground),
+                        BackgroundScalingFit(findBackground))
+    scs, convals, aGoFs = batchFit.calcBatch(data, dataCalcs, sc, 1)
+    for i, row in enumerate(dataCalcs):
+        rowSc, conval, dummy, aGoF = rowFit.calc(data, DummyModelData(row),
+                                                 sc.copy())
+        assert numpy.allclose(scs[i], rowSc, rtol = 1e-9, atol = 1e-12)
+        assert numpy.allclose(convals[i], conval, rtol = 1e-9)
+        assert numpy.allclose(aGoFs[i], aGoF, rtol = 1e-9)
+
+def testCalcBatch():
+    """Fitting a batch of model intensities at once gives the same results
+    as fitting each one."""
+    for findBackground in True, False:
+        compareBatch(findBackground)
+
+# vim: set ts=4 sts=4 sw=4 tw=0:
@@ -14,13 +14,15 @@ from numpy import (inf, array, reshape, shape, pi, diff, zeros,
 # numpy.seterr(all = "raise", under = "ignore")
 from scipy import optimize
 import time # Timekeeping and timing of objects
+import os
+import multiprocessing
 import copy
 import logging
 logging.basicConfig(level = logging.INFO)
 
 from utils import isList 
 from bases.dataset import DataSet
-from bases.algorithm import AlgorithmBase
+from bases.algorithm import AlgorithmBase, NumberGenerator
 from utils.parameter import isActiveFitParam
 from utils.tests import isMac
 from bases.model import ScatteringModel
@@ -31,6 +33,65 @@ from . import PlotResults
 from . import McSASParameters
 from dataobj import SASData
 
+# The McSAS instance used by the worker processes of McSAS.analyse(),
+# McSAS.histogram() and McSAS.gen2DMeasVal(), inherited by forking. Data and
+# model types are created dynamically and can not be pickled reliably.
+_poolAlgo = None
+
+def _forkPool(processes):
+    """Returns a pool of forked worker processes or None if forking is not
+    available."""
+    try:
+        context = multiprocessing.get_context("fork")
+    except AttributeError: # python 2, always forks on posix
+        if not hasattr(os, "fork"):
+            return None
+        context = multiprocessing
+    except ValueError: # fork not supported, on windows
+        return None
+    return context.Pool(processes)
+
+def _cpuCount():
+    """Returns the number of processors available, 1 if unknown."""
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+def _repetitionSeeds(numReps):
+    """Independent random seeds for each repetition, derived from the
+    global numpy random state for reproducibility. The spawned children
+    of a SeedSequence, integers on numpy < 1.17."""
+    entropy = numpy.random.randint(2**31)
+    try:
+        return numpy.random.SeedSequence(entropy).spawn(numReps)
+    except AttributeError: # numpy < 1.17
+        return numpy.random.RandomState(entropy).randint(2**31, size = numReps)
+
+def _seedRepetition(seed):
+    """Seeds the random number generators for a single repetition with one
+    of the seeds returned by :py:func:`_repetitionSeeds`."""
+    # the generator of the MC proposals takes the SeedSequence as is
+    NumberGenerator.seed(seed)
+    try: # the legacy global state accepts integers only
+        numpy.random.seed(seed.generate_state(1)[0])
+    except AttributeError:
+        numpy.random.seed(seed)
+
+def _poolFitRepetition(args):
+    """Runs a single repetition in a worker process, see McSAS.analyse()."""
+    return _poolAlgo._fitRepetition(*args)
+
+def _poolHistogramRepetition(rset):
+    """Evaluates a single repetition in a worker process, see
+    McSAS.histogram()."""
+    return _poolAlgo._histogramRepetition(rset)
+
+def _poolMeasValRepetition(args):
+    """Evaluates a single repetition in a worker process, see
+    McSAS.gen2DMeasVal()."""
+    return _poolAlgo._measValRepetition(*args)
+
 class McSAS(AlgorithmBase):
     r"""
     Main class containing all functions required to do Monte Carlo fitting.
@@ -214,55 +275,49 @@ class McSAS(AlgorithmBase):
 
         # This is the loop that repeats the MC optimization numReps times,
         # after which we can calculate an uncertainty on the Results.
-        for nr in range(numReps):
-            elapsedStart = time.time() # for tracking elapsed time
-            # keep track of how many failed attempts there have been
-            nt = 0
-            # do that MC thing! 
-            convergence = inf
-            while convergence > minConvergence:
-                if nt > self.maxRetries():
-                    # this is not a coincidence.
-                    # We have now tried maxRetries+2 times
-                    logging.warning("Could not reach optimization criterion "
-                                    "within {0} attempts, exiting..."
-                                    .format(self.maxRetries() + 2))
-                    if self.showIncomplete():
-                        break
-                    else:
-                        return
-                # retry in the case we were unlucky in reaching
-                # convergence within MaximumIterations.
-                (contributions[:, :, nr], contribMeasVal[:, :, nr],
-                 convergence, details) = self.mcFit(
-                                numContribs, minConvergence,
-                                outputMeasVal = True, outputDetails = True,
-                                nRun = nr)
-                if any(array(contributions.shape) == 0):
-                    break # nothing active, nothing to fit
-                if self.stop:
-                    logging.warning("Stop button pressed, exiting...")
-                    if self.showIncomplete():
-                        break
-                    else:
-                        return
-                nt += 1
-            # in minutes:
-            # keep track of how many iterations were needed to reach converg.
-            numIter[nr] = details.get('numIterations', 0)
-            scalings[nr] = details.get('scaling', 1.0) 
-            backgrounds[nr] = details.get('background', 0) 
-            elapsedTime = (time.time() - elapsedStart)
-            times[nr] = elapsedTime 
-
-            tottime = times.sum() /60. # total elapsed time in minutes
-            avetime = times[times > 0].mean() / 60. # average optimization time
-            remtime = (avetime * numReps - tottime) # est. remaining time
-            logging.info("finished optimization number {0} of {1}\n"
-                    "  total elapsed time: {2} minutes\n"
-                    "  average time per optimization {3} minutes\n"
-                    "  total time remaining {4} minutes"
-                    .format(nr+1, numReps, tottime, avetime, remtime))
+        # The repetitions are independent and may run in parallel.
+        # Each one is seeded on its own, the same way in both cases.
+        args = [(numContribs, minConvergence, nr, seed)
+                for nr, seed in enumerate(_repetitionSeeds(numReps))]
+        pool, numCores = self._startPool(numReps)
+        if pool is None:
+            results = (self._fitRepetition(*arg) for arg in args)
+        else: # waits for the workers without blocking the GUI
+            results = self._poolResults(
+                    pool.imap_unordered(_poolFitRepetition, args),
+                    stoppable = True)
+        try:
+            for finished, res in enumerate(results):
+                if res is None: # stopped or not converged
+                    return
+                nr, rset, measVal, details, elapsedTime = res
+                contributions[:, :, nr], contribMeasVal[:, :, nr] = (
+                        rset, measVal)
+                if pool is not None: # store results in parameters here
+                    for idx, param in enumerate(self.model.activeParams()):
+                        param.setActiveVal(rset[:, idx], index = nr)
+                # keep track of how many iterations were needed to reach converg.
+                numIter[nr] = details.get('numIterations', 0)
+                scalings[nr] = details.get('scaling', 1.0) 
+                backgrounds[nr] = details.get('background', 0) 
+                times[nr] = elapsedTime 
+
+                # in minutes:
+                tottime = times.sum() /60. # total elapsed time in minutes
+                avetime = times[times > 0].mean() / 60. # average optimization time
+                remtime = (avetime * numReps - tottime) / numCores # est. remaining time
+                logging.info("finished optimization number {0} of {1}\n"
+                        "  total elapsed time: {2} minutes\n"
+                        "  average time per optimization {3} minutes\n"
+                        "  total time remaining {4} minutes"
+                        .format(finished+1, numReps, tottime, avetime, remtime))
+            if pool is not None and self.stop:
+                # the workers do not see the stop flag of this process,
+                # the pool is terminated with the remaining repetitions
+                logging.warning("Stop button pressed, exiting...")
+                return
+        finally:
+            self._stopPool(pool)
 
         # store in output dict
         scalingsDDoF = 0
@@ -287,6 +342,90 @@ class McSAS(AlgorithmBase):
             # average number of iterations for all repetitions
             numIter = numIter.mean()))
 
+    def _startPool(self, numTasks):
+        """Returns a pool of worker processes for *numTasks* independent
+        tasks and the number of processes, None and 1 if the tasks are to
+        run serially. More processes than tasks or processors would idle or
+        compete for the same cores."""
+        global _poolAlgo
+        numCores = min(self.numCores(), numTasks, _cpuCount())
+        if numCores < 2:
+            return None, 1
+        _poolAlgo = self # inherited by the forked worker processes
+        pool = _forkPool(numCores)
+        if pool is None:
+            _poolAlgo = None
+            logging.warning("Parallel processing not supported on this "
+                            "platform, using a single core.")
+            return None, 1
+        return pool, numCores
+
+    def _poolResults(self, results, stoppable = False):
+        """Yields the results of a pool iterator as they arrive, meanwhile
+        GUI events are processed. With *stoppable*, it ends early once the
+        user pressed stop. The pool has to be terminated by the caller."""
+        while not (stoppable and self.stop):
+            try:
+                res = results.next(timeout = 0.25)
+            except multiprocessing.TimeoutError:
+                processEventLoop() # check for user input
+                continue
+            except StopIteration:
+                return
+            yield res
+
+    @staticmethod
+    def _stopPool(pool):
+        """Shuts down a pool returned by :py:meth:`_startPool`."""
+        global _poolAlgo
+        _poolAlgo = None
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    def _fitRepetition(self, numContribs, minConvergence, nRun, seed = None):
+        """Runs the Monte Carlo optimisation for repetition *nRun*, retrying
+        up to *maxRetries* times if convergence is not achieved. The random
+        number generators are reseeded by *seed* first, if given.
+        Returns a tuple (*nRun*, *contribs*, *measVal*, *details*,
+        *elapsedTime*) or None if the analysis should be aborted.
+        """
+        if seed is not None:
+            _seedRepetition(seed)
+        elapsedStart = time.time() # for tracking elapsed time
+        maxRetries, showIncomplete = self.maxRetries(), self.showIncomplete()
+        # keep track of how many failed attempts there have been
+        nt = 0
+        # do that MC thing! 
+        convergence = inf
+        while convergence > minConvergence:
+            if nt > maxRetries:
+                # this is not a coincidence.
+                # We have now tried maxRetries+2 times
+                logging.warning("Could not reach optimization criterion "
+                                "within {0} attempts, exiting..."
+                                .format(maxRetries + 2))
+                if showIncomplete:
+                    break
+                else:
+                    return None
+            # retry in the case we were unlucky in reaching
+            # convergence within MaximumIterations.
+            (rset, measVal, convergence, details) = self.mcFit(
+                            numContribs, minConvergence,
+                            outputMeasVal = True, outputDetails = True,
+                            nRun = nRun)
+            if any(array(rset.shape) == 0):
+                break # nothing active, nothing to fit
+            if self.stop:
+                logging.warning("Stop button pressed, exiting...")
+                if showIncomplete:
+                    break
+                else:
+                    return None
+            nt += 1
+        return nRun, rset, measVal, details, time.time() - elapsedStart
+
     def mcFit(self, numContribs, minConvergence,
               outputMeasVal = False, outputDetails = False, nRun = None):
         """
@@ -305,23 +444,49 @@ class McSAS(AlgorithmBase):
         """
         data = self.data
         rset = numpy.zeros((numContribs, self.model.activeParamCount()))
+        # settings are constant during the fit, read them once
         compensationExponent = self.compensationExponent()
+        maxIterations = self.maxIterations()
+        numReps = self.numReps()
+        singlePrecision = self.singlePrecision()
+        numPrefetch = max(1, self.numPrefetch())
+        startFromMinimum = self.startFromMinimum()
         details = dict()
         # index of sphere to change. We'll sequentially change spheres,
         # which is perfectly random since they are in random order.
         
-        if self.startFromMinimum():
-            for idx, param in enumerate(self.model.activeParams()):
-                mb = min(param.activeRange())
-                if mb == 0: # FIXME: compare with EPS eventually?
-                    mb = pi / (data.x0.limit[1])
-                rset[:, idx] = numpy.ones(numContribs) * mb * .5
+        if startFromMinimum:
+            # lower bounds of all active parameters, ranges are sorted
+            mb = numpy.array([param.activeRange()[0]
+                              for param in self.model.activeParams()])
+            # FIXME: compare with EPS eventually?
+            mb[mb == 0] = pi / (data.x0.limit[1])
+            rset[:] = mb * .5 # the same for all contributions
         else:
             rset = self.model.generateParameters(numContribs)
 
-        modelData = self.model.calc(data, rset, compensationExponent)
-        ft, vset, wset, sset = (modelData.cumInt, modelData.vset,
-                                modelData.wset, modelData.sset)
+        # keep the intensity of each contribution, one per row, for
+        # updating the total intensity when a single contribution changes
+        if startFromMinimum and numContribs > 1:
+            # identical contributions, calculated once and repeated
+            intensities, vset, wset, sset = (
+                values.repeat(numContribs, axis = 0) for values in
+                self.model.calcContributions(data, rset[:1],
+                                             compensationExponent))
+        else:
+            intensities, vset, wset, sset = self.model.calcContributions(
+                                            data, rset, compensationExponent)
+        if singlePrecision:
+            # normalized to avoid underflow of the tiny absolute intensities
+            intScale = intensities.max()
+            intScale = 1. / intScale if intScale > 0. else 1.
+            intensities = (intensities * intScale).astype(numpy.float32)
+        modelData = self.model.getModelData(
+                self.model.sumContributions(intensities), vset, wset, sset)
+        ft = modelData.cumInt
+        # working buffer for the total intensity of a trial, swapped with
+        # the current total on acceptance, avoids allocation per iteration
+        ftest = numpy.empty_like(ft)
 
         # Optimize the intensities and calculate convergence criterium
         # generate initial guess for scaling factor and background
@@ -336,75 +501,125 @@ class McSAS(AlgorithmBase):
         # weights which is << 1 (for SAXS, usually it's the sum
         # of the scatterers volumes), though increasing ft and reducing the
         # scaling sc[0]; when histogramming, this gets reverted
-        sc, conval, dummy, dummy2 = bgScalingFit.calc(data, modelData, sc,
-                                                      ver = 1)
-        # reoptimize with V2, there might be a slight discrepancy in the
-        # residual definitions of V1 and V2 which would prevent optimization.
+        # solved directly as in the MC loop, the initial guess is used only
+        # if the linear least squares problem is singular
         sc, conval, dummy, dummy2 = bgScalingFit.calc(data, modelData, sc)
         logging.info("Initial Chi-squared value: {0}".format(conval))
 
+        # bound methods called in each iteration, resolved once
+        generateParameters = self.model.generateParameters
+        calcContributions = self.model.calcContributions
+        getModelData = self.model.getModelData
+        bgScalingFitCalc = bgScalingFit.calc
+        bgScalingFitCalcBatch = bgScalingFit.calcBatch
+        numParams = modelData.numParams
+
         # start the MC procedure
         start = time.time()
         # progress tracking:
         numMoves, numIter, lastUpdate = 0, 0, 0
         # running variable indicating which contribution to change
         ri = 0
-        ftest = None
+        # proposals do not depend on the current state, they are generated
+        # and calculated in batches of numPrefetch, propIdx is the next unused
+        propIdx, propParams = numPrefetch, None
+        # parameters of the proposals are drawn for several batches at once
+        poolSize = numPrefetch * max(1, NumberGenerator.bufferSize // numPrefetch)
+        paramPool, poolPos = None, poolSize
+        # sum of weights, updated on acceptance and resynchronized
+        # periodically to bound accumulated round-off
+        wSum = wset.sum()
         #NOTE: keep track of uncertainties in MC procedure through epsilon
         while (len(wset) > 1 and # see if there is a distribution at all
                conval > minConvergence and
-               numIter < self.maxIterations.value() and
+               numIter < maxIterations and
                not self.stop):
-            rt = self.model.generateParameters()
-            # calculate contribution measVal:
-            newModelData = self.model.calc(data, rt, compensationExponent)
-            # Calculate new total measVal, subtract old measVal, add new:
-            oldModelData = self.model.calc(data, rset[ri].reshape((1, -1)),
-                                               compensationExponent)
-            testModelData = self.model.getModelData(
-                # is numerically stable (so far). Can calculate final uncertainty
-                # based on number of valid "moves" and sys.float_info.epsilon
-                ft - oldModelData.cumInt + newModelData.cumInt,
-                vset,
-                # not as intended but sufficient for now
-                wset.sum() - wset[ri] + newModelData.wset,
-                sset) # surface from testModelData is not used
-#            ftest = (ft - oldModelData.cumInt + newModelData.cumInt)
-#            wtest = wset.sum() - wset[ri] + newModelData.wset
-            # optimize measVal and calculate convergence criterium
-            # using version two here for a >10 times speed improvement
-            sct, convalt, dummy, aGoFs = bgScalingFit.calc(
+            if _poolAlgo is None and time.time() - lastUpdate > 0.25:
+                # update twice a sec max -> speedup for fast models
+                # because output takes much time especially in GUI
+                # not done in worker processes of a parallel analyse()
+
+                # process events, check for user input
+                processEventLoop()
+                lastUpdate = time.time()
+            if propIdx >= numPrefetch:
+                if poolPos >= poolSize:
+                    paramPool, poolPos = generateParameters(poolSize), 0
+                propParams = paramPool[poolPos:poolPos + numPrefetch]
+                poolPos += numPrefetch
+                # calculate contribution measVal:
+                propInt, propV, propW, propS = calcContributions(
+                                    data, propParams, compensationExponent)
+                if singlePrecision:
+                    propInt = (propInt * intScale).astype(numpy.float32)
+                propIdx = 0
+            if numPrefetch > 1:
+                # The remaining proposals of the batch replace the next
+                # contributions in turn. Until one improves the fit, they are
+                # tested against the same state and are evaluated at once.
+                count = min(numPrefetch - propIdx, maxIterations - numIter)
+                ris = (ri + numpy.arange(count)) % numContribs
+                ftests = ft - intensities[ris]
+                ftests += propInt[propIdx:propIdx + count]
+                scts, convalts, aGoFsAll = bgScalingFitCalcBatch(
+                                                data, ftests, sc, numParams)
+                improved = numpy.flatnonzero(convalts < conval)
+                # proposals up to the first improvement are rejected
+                rejected = improved[0] if len(improved) else count
+                numIter, propIdx = numIter + rejected, propIdx + rejected
+                ri = (ri + rejected) % numContribs
+                if not len(improved):
+                    continue
+                ftest[:] = ftests[rejected]
+                sct, convalt = scts[rejected], convalts[rejected]
+                aGoFs = aGoFsAll[rejected]
+            rt, newInt = propParams[propIdx], propInt[propIdx]
+            newV, newS = propV[propIdx], propS[propIdx]
+            newW = propW[propIdx:propIdx+1]
+            propIdx += 1
+            if numPrefetch == 1:
+                # Calculate new total measVal, subtract old measVal, add new,
+                # the old one is stored already:
+                # is numerically stable (so far). Can calculate final
+                # uncertainty based on number of valid "moves" and
+                # sys.float_info.epsilon
+                numpy.subtract(ft, intensities[ri], out = ftest)
+                ftest += newInt
+                testModelData = getModelData(
+                    ftest,
+                    vset,
+                    # not as intended but sufficient for now
+                    wSum - wset[ri] + newW,
+                    sset) # surface from testModelData is not used
+                # optimize measVal and calculate convergence criterium
+                # using version two here for a >10 times speed improvement
+                sct, convalt, dummy, aGoFs = bgScalingFitCalc(
                                                     data, testModelData, sc)
             # test if the radius change is an improvement:
             if convalt < conval: # it's better
                 # replace current settings with better ones
                 rset[ri], sc, conval = rt, sct, convalt
-                ft, wset[ri] = testModelData.cumInt, newModelData.wset
+                ft, ftest = ftest, ft # keep the trial, reuse the old one
+                wSum += newW[0] - wset[ri]
+                wset[ri] = newW[0]
+                intensities[ri] = newInt
                 # updating unused data for completeness as well
-                vset[ri], sset[ri] = newModelData.vset, newModelData.sset
+                vset[ri], sset[ri] = newV, newS
                 logging.info("rep {rep}/{reps}, good iter {it}: "
                              "Chisqr= {cs:f}/{conv:.2f}, aGoFs= {opt}\r"
                              .format(it = numIter, cs = conval,
                                  conv = minConvergence, rep = nRun+1,
-                                 reps = self.numReps(), opt = aGoFs))
+                                 reps = numReps, opt = aGoFs))
                 numMoves += 1
+                if not numMoves % 10000:
+                    wSum = wset.sum()
 
-            if time.time() - lastUpdate > 0.25:
-                # update twice a sec max -> speedup for fast models
-                # because output takes much time especially in GUI
-                # TODO: don't need this:
-                # if we calc in separate processes (multiprocessing) the gui 
-                # would have its own thread and will not be blocked by calc
-
-                # process events, check for user input
-                processEventLoop()
-                lastUpdate = time.time()
             # move to next contribution in list, loop if last contribution
             ri = (ri + 1) % numContribs
             numIter += 1 # add one to the iteration number
 
         #print # for progress print in the loop
-        if numIter >= self.maxIterations.value():
+        if numIter >= maxIterations:
             logging.warning("Exited due to max. number of iterations ({0}) "
                             "reached".format(numIter))
         else:
@@ -421,6 +636,11 @@ class McSAS(AlgorithmBase):
             'numMoves': numMoves,
             'elapsed': elapsed})
 
+        if singlePrecision:
+            # final result in double precision, summed up from scratch
+            ft = self.model.sumContributions(intensities,
+                                             dtype = numpy.float64) / intScale
+            sc[0] *= intScale
         modelData = self.model.getModelData(ft, vset, wset, sset)
         sc, conval, ifinal, dummy = bgScalingFit.calc(data, modelData, sc)
         details.update({'scaling': sc[0], 'background': sc[1]})
@@ -517,102 +737,159 @@ class McSAS(AlgorithmBase):
             logging.info("Nothing to histogram, giving up.")
             return
         numContribs, dummy, numReps = contribs.shape
-
-        # volume fraction for each contribution
-        volumeFraction = zeros((numContribs, numReps))
-        # number fraction for each contribution
-        numberFraction = zeros((numContribs, numReps))
-        volSqrFraction = zeros((numContribs, numReps))
-        surfaceFraction = zeros((numContribs, numReps))
-        # volume frac. for each histogram bin
-        minReqVol = zeros((numContribs, numReps)) 
-        # number frac. for each histogram bin
-        minReqNum = zeros((numContribs, numReps))
-        minReqVolSqr = zeros((numContribs, numReps))
-        minReqSurface = zeros((numContribs, numReps))
-        totalVolumeFraction = zeros((numReps))
-        totalNumberFraction = zeros((numReps))
-        totalVolSqrFraction = zeros((numReps))
-        totalSurfaceFraction = zeros((numReps))
+        # single precision halves the memory read by the reductions over
+        # all contributions below, they accumulate in double precision
+        dtype = numpy.float32 if self.singlePrecision() else numpy.float64
+
+        # all per contribution results in a single allocation, one view
+        # each <number of contributions x number of repetitions>:
+        # volume, number, volume squared and surface fraction for each
+        # contribution and their minimum required fraction (observability)
+        (volumeFraction, numberFraction, volSqrFraction, surfaceFraction,
+         minReqVol, minReqNum, minReqVolSqr, minReqSurface) = zeros(
+                (8, numContribs, numReps), dtype = dtype)
+        # their totals for each repetition, a single allocation as well
+        (totalVolumeFraction, totalNumberFraction, totalVolSqrFraction,
+         totalSurfaceFraction) = zeros((4, numReps))
         # MeasVal scaling factors for matching to the experimental
         # scattering pattern (Amplitude A and flat background term b,
         # defined in the paper)
         scalingFactors = zeros((2, numReps))
 
-        # data, store it in result too, enables to postprocess later
-        # store the model instance too
-        data = self.data
-        bgScalingFit = BackgroundScalingFit(self.findBackground.value(),
-                                            self.model)
-        # calc vol/num fraction and scaling factors for each repetition
-        for ri in range(numReps):
-            rset = contribs[:, :, ri] # single set of R for this calculation
-            # compensated volume for each sphere vset:
-            modelData = self.model.calc(data, rset, self.compensationExponent())
-            if not len(modelData.cumInt):
+        # calc vol/num fraction and scaling factors for each repetition,
+        # the repetitions are independent and may run in parallel
+        pool, dummy = self._startPool(numReps)
+        if pool is None:
+            results = (self._histogramRepetition(contribs[:, :, ri])
+                       for ri in range(numReps))
+        else: # ordered, the results are stored by repetition index
+            results = self._poolResults(pool.imap(_poolHistogramRepetition,
+                                [contribs[:, :, ri] for ri in range(numReps)]))
+        try:
+            results = list(results)
+        finally:
+            self._stopPool(pool)
+        # volumes and surfaces of all contributions, skipped repetitions
+        # keep zero fractions
+        vsets, ssets = numpy.ones((numContribs, numReps)), zeros(
+                                                    (numContribs, numReps))
+        for ri, res in enumerate(results):
+            if res is None:
                 continue
-            ## TODO: same code than in mcfit pre-loop around line 1225 ff.
-            # initial guess for the scaling factor.
-            sc = numpy.array([data.f.limit[1] / modelData.cumInt.max(), data.f.limit[0]])
-            # optimize scaling and background for this repetition
-            sc, conval, dummy, dummy2 = bgScalingFit.calc(data, modelData, sc)
-            scalingFactors[:, ri] = sc # scaling and bgnd for this repetition.
-            # calculate individual volume fractions:
-            # here, the weight reverts intensity normalization effecting the
-            # scaling sc[0] during optimization, it does not influence
-            # the resulting volFrac
-            volumeFraction[:, ri] = modelData.volumeFraction(sc[0])
-            totalVolumeFraction[ri] = sum(volumeFraction[:, ri])
-            numberFraction[:, ri] = volumeFraction[:, ri]/modelData.vset.flatten()
-            totalNumberFraction[ri] = sum(numberFraction[:, ri])
-            volSqrFraction[:, ri] = volumeFraction[:, ri]*modelData.vset.flatten()
-            totalVolSqrFraction[ri] = sum(volSqrFraction[:, ri])
-            surfaceFraction[:, ri] = numberFraction[:, ri]*modelData.sset.flatten()
-            totalSurfaceFraction[ri] = sum(surfaceFraction[:, ri])
-
-            # calc observability for each sphere/contribution
-            for c in range(numContribs):
-                # observability: the maximum contribution for
-                # that sphere to the total scattering pattern
-                # NOTE: no need to compensate for p_c here, we work with
-                # volume fraction later which is compensated by default.
-                # additionally, we actually do not use this value.
-                # again, partial intensities for this size only required
-                partialModelData = self.model.calc(data, rset[c].reshape((1, -1)),
-                                                   self.compensationExponent())
-                # dividing by zero tends to go towards infinity,
-                # when chosing the minimum those can be ignored
-                weightedInt = data.f.binnedDataU * volumeFraction[c, ri]
-                partialCumIntScaled = sc[0] * partialModelData.cumInt
-                indices = (partialCumIntScaled != 0.)
-                minReqVol[c, ri] = (
-                    weightedInt[indices] / partialCumIntScaled[indices]).min()
-                minReqNum[c, ri] = minReqVol[c, ri] / modelData.vset[c]
-                minReqVolSqr[c, ri] = (minReqNum[c, ri]
-                        * minReqVol[c, ri] * minReqVol[c, ri])
-                minReqSurface[c, ri] = (minReqNum[c, ri] * modelData.sset[c])
-
-            if 0 != totalNumberFraction[ri]:
-                numberFraction[:, ri] /= totalNumberFraction[ri]
-                minReqNum[:, ri]      /= totalNumberFraction[ri]
-            if 0 != totalVolSqrFraction[ri]:
-                volSqrFraction[:, ri] /= totalVolSqrFraction[ri]
-                minReqVolSqr[:, ri]   /= totalVolSqrFraction[ri]
-            if 0 != totalSurfaceFraction[ri]:
-                surfaceFraction[:, ri] /= totalSurfaceFraction[ri]
-                minReqSurface[:, ri]   /= totalSurfaceFraction[ri]
+            (scalingFactors[:, ri], vsets[:, ri], ssets[:, ri],
+             volumeFraction[:, ri], minReqVol[:, ri]) = res
+
+        # derived fractions of all repetitions at once, written into the
+        # preallocated arrays in place
+        numpy.divide(volumeFraction, vsets, out = numberFraction)
+        numpy.multiply(volumeFraction, vsets, out = volSqrFraction)
+        numpy.multiply(numberFraction, ssets, out = surfaceFraction)
+        numpy.divide(minReqVol, vsets, out = minReqNum)
+        numpy.multiply(minReqNum, minReqVol, out = minReqVolSqr)
+        minReqVolSqr *= minReqVol
+        numpy.multiply(minReqNum, ssets, out = minReqSurface)
+        for total, fraction in ((totalVolumeFraction, volumeFraction),
+                                (totalNumberFraction, numberFraction),
+                                (totalVolSqrFraction, volSqrFraction),
+                                (totalSurfaceFraction, surfaceFraction)):
+            numpy.sum(fraction, axis = 0, dtype = numpy.float64, out = total)
+        # normalized by their totals, where those are not zero
+        for total, fraction, minReq in (
+                (totalNumberFraction, numberFraction, minReqNum),
+                (totalVolSqrFraction, volSqrFraction, minReqVolSqr),
+                (totalSurfaceFraction, surfaceFraction, minReqSurface)):
+            valid = (total != 0)
+            fraction[:, valid] /= total[valid]
+            minReq[:, valid] /= total[valid]
+
+        # common result, required by gen2DMeasVal()
+        self.result[0]['scalingFactors'] = scalingFactors
 
         fractions = dict(vol = (volumeFraction, minReqVol),
                          num = (numberFraction, minReqNum),
                          volsqr = (volSqrFraction, minReqVolSqr),
                          surf = (surfaceFraction, minReqSurface))
 
+        # parameter major memory layout, the values of each parameter
+        # contribs[:, paramIndex, :] become a contiguous block for the
+        # reductions over contributions and repetitions in the histograms
+        contribs = numpy.ascontiguousarray(contribs.transpose(1, 0, 2),
+                                           dtype = dtype).transpose(1, 0, 2)
         # now we histogram over each variable
         # for each variable parameter we define,
         # we need to histogram separately.
         for paramIndex, param in enumerate(self.model.activeParams()):
             param.histograms().calc(contribs, paramIndex, fractions) # new method
 
+    def _histogramRepetition(self, rset):
+        """Fits scaling and background of a single repetition *rset* of
+        :py:meth:`histogram` again and calculates the volume fraction as well
+        as the minimum required volume of each contribution. Returns the
+        scaling factors, volumes, surfaces, volume fractions and minimum
+        required volumes or None if there is no intensity."""
+        data = self.data
+        bgScalingFit = BackgroundScalingFit(self.findBackground.value(),
+                                            self.model)
+        # compensated volume for each sphere vset, keeping the
+        # intensities of each contribution for the observability below
+        intensities, vset, wset, sset = self.model.calcContributions(
+                                    data, rset, self.compensationExponent())
+        modelData = self.model.getModelData(
+                self.model.sumContributions(intensities), vset, wset, sset)
+        if not len(modelData.cumInt):
+            return None
+        ## TODO: same code than in mcfit pre-loop around line 1225 ff.
+        # initial guess for the scaling factor.
+        sc = numpy.array([data.f.limit[1] / modelData.cumInt.max(), data.f.limit[0]])
+        # optimize scaling and background for this repetition
+        sc, conval, dummy, dummy2 = bgScalingFit.calc(data, modelData, sc)
+        # calculate individual volume fractions:
+        # here, the weight reverts intensity normalization effecting the
+        # scaling sc[0] during optimization, it does not influence
+        # the resulting volFrac
+        volFrac = modelData.volumeFraction(sc[0])
+        # calc observability for all spheres/contributions at once,
+        # one row each
+        # observability: the maximum contribution for
+        # that sphere to the total scattering pattern
+        # NOTE: no need to compensate for p_c here, we work with
+        # volume fraction later which is compensated by default.
+        # additionally, we actually do not use this value.
+        # again, partial intensities for this size only required
+        # dividing by zero tends to go towards infinity,
+        # when chosing the minimum those can be ignored
+        # The ratio of uncertainty times volume fraction to the scaled
+        # intensity. The volume fraction of a contribution is a common
+        # factor of its row, taken out of the minimum, the scaling factor is
+        # applied to the uncertainties once. Both have the same sign, their
+        # absolute values keep the ratios positive.
+        # Scaled to the measured data, single precision suffices for the
+        # ratios if requested, only their minimum is kept.
+        dtype, rowScale = numpy.float64, 1.
+        with numpy.errstate(divide = 'ignore', invalid = 'ignore'):
+            uncertainty = data.f.binnedDataU / abs(sc[0])
+            scaled = intensities
+            if self.singlePrecision():
+                # normalized to avoid underflow of the tiny absolute
+                # intensities and uncertainties, each row by its maximum,
+                # the common factors are applied to the minimum below
+                dtype = numpy.float32
+                uncScale = abs(uncertainty).max()
+                uncScale = uncScale if uncScale > 0. else 1.
+                intScale = abs(intensities).max(axis = 1)
+                intScale[intScale == 0.] = 1.
+                uncertainty = uncertainty / uncScale
+                scaled = intensities / intScale[:, newaxis]
+                rowScale = uncScale / intScale
+            ratio = numpy.where(intensities != 0.,
+                                numpy.divide(uncertainty[newaxis, :],
+                                             scaled, dtype = dtype),
+                                inf)
+            minReqVol = abs(volFrac) * (ratio.min(axis = 1) * rowScale)
+        # zero volume fraction and no intensity: never observable
+        minReqVol[numpy.isnan(minReqVol)] = inf
+        return sc, modelData.vset, modelData.sset, volFrac, minReqVol
+
     def gen2DMeasVal(self):
         """
         This function is optionally run after the histogram procedure for
@@ -623,25 +900,30 @@ class McSAS(AlgorithmBase):
         numContribs, dummy, numReps = contribs.shape
 
         # load original Dataset
-        x0 = data.x0.binnedData
+        data = self.data
         # we need to recalculate the result in two dimensions
-        kansas = shape(q) # we will return to this shape
-        x0 = x0.sanitized.flatten()
+        kansas = shape(data.x0.binnedData) # we will return to this shape
 
         logging.info("Recalculating 2D measVal, please wait")
-        # for each Result
-        intAvg = zeros(shape(x0))
         # TODO: for which parameter?
         scalingFactors = self.result[0]['scalingFactors']
-        for ri in range(numReps):
-            logging.info('regenerating set {} of {}'.format(ri, numReps-1))
-            rset = contribs[:, :, ri]
-            # calculate their form factors
-            # ft, vset, wset = self.model.calc(data, rset, compensationExponent)
-            modelData = self.model.calc(data, rset, compensationExponent)
-            # Optimize the intensities and calculate convergence criterium
-            intAvg = (intAvg + modelData.cumInt*scalingFactors[0, ri]
-                             + scalingFactors[1, ri])
+        # the repetitions are independent and may run in parallel, their
+        # scaled intensities are summed up in order of repetition
+        args = [(contribs[:, :, ri], scalingFactors[:, ri])
+                for ri in range(numReps)]
+        pool, dummy = self._startPool(numReps)
+        if pool is None:
+            results = (self._measValRepetition(*arg) for arg in args)
+        else:
+            results = self._poolResults(
+                    pool.imap(_poolMeasValRepetition, args))
+        intAvg = 0.
+        try:
+            for ri, measVal in enumerate(results):
+                logging.info('regenerated set {} of {}'.format(ri, numReps-1))
+                intAvg = intAvg + measVal
+        finally:
+            self._stopPool(pool)
         # print "Initial conval V1", Conval1
         intAvg /= numReps
         # mask (lifted from clipDataset)
@@ -649,6 +931,15 @@ class McSAS(AlgorithmBase):
         # shape back to imageform
         self.result[0]['measVal2d'] = reshape(intAvg, kansas)
 
+    def _measValRepetition(self, rset, sc):
+        """Returns the intensity of a single repetition *rset* of
+        :py:meth:`gen2DMeasVal`, scaled by the scaling factor and background
+        *sc*."""
+        # calculate their form factors
+        modelData = self.model.calc(self.data, rset,
+                                    self.compensationExponent())
+        return modelData.cumInt * sc[0] + sc[1]
+
     def plot(self, axisMargin = 0.3,
              outputFilename = None, autoClose = False):
         """Expects outputFilename to be of type gui.calc.OutputFilename."""
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# mcsas/mcsas_test.py
+
+from __future__ import absolute_import # PEP328
+import logging
+import numpy
+from mcsas.mcsas import McSAS
+from dataobj import SASData
+from models.sphere import Sphere
+
+logging.disable(logging.INFO)
+
+def getSphereData(count = 50, radius = 5.):
+    """Scattering of a single sphere with 2% uncertainty."""
+    q = numpy.logspace(-1.5, 0.3, count)
+    qr = q * radius
+    intensity = (3. * (numpy.sin(qr) - qr * numpy.cos(qr)) / qr**3)**2
+    intensity = intensity * 1e3 + 0.1
+    return SASData(title = "sphere",
+                   rawArray = numpy.column_stack((q, intensity,
+                                                  intensity * .02)))
+
+def getAlgo(numReps = 2, numContribs = 20, maxIterations = 500):
+    algo = McSAS.factory()()
+    algo.data = getSphereData()
+    algo.model = Sphere()
+    algo.model.radius.setActiveRange((1e-9, 2e-8))
+    algo.numReps.setValue(numReps)
+    algo.numContribs.setValue(numContribs)
+    algo.maxIterations.setValue(maxIterations)
+    algo.maxRetries.setValue(0)
+    algo.showIncomplete.setValue(True)
+    return algo
+
+def calcSeeded(algo, seed):
+    numpy.random.seed(seed)
+    algo.calc()
+    return algo.result[0]['contribs'].copy()
+
+def testSeededRepetitions():
+    """Seeding numpy reproduces the contributions of a serial run, also
+    after previous runs in the same process."""
+    algo = getAlgo()
+    first = calcSeeded(algo, 3)
+    assert numpy.array_equal(first, calcSeeded(algo, 3))
+    assert not numpy.array_equal(first, calcSeeded(algo, 4))
+    assert numpy.array_equal(first, calcSeeded(getAlgo(), 3))
+
+def testPrefetchedProposals():
+    """Testing batches of prefetched proposals accepts the same ones as
+    testing each proposal on its own."""
+    serial = getAlgo(maxIterations = 2000)
+    batched = getAlgo(maxIterations = 2000)
+    serial.numPrefetch.setValue(1)
+    batched.numPrefetch.setValue(16)
+    assert numpy.allclose(calcSeeded(serial, 5), calcSeeded(batched, 5),
+                          rtol = 1e-12, atol = 0.)
+    assert serial.result[0]['numIter'] == batched.result[0]['numIter']
+    assert numpy.allclose(serial.result[0]['scaling'],
+                          batched.result[0]['scaling'], rtol = 1e-9)
+
+def testObservabilitySinglePrecision():
+    """The minimum required volume fraction of tiny contributions, with
+    absolute intensities beyond the range of single precision, is the same
+    in single and double precision."""
+    algo = getAlgo()
+    rset = numpy.linspace(2e-11, 2e-10, 10)[:, numpy.newaxis]
+    minReqVol = []
+    for singlePrecision in False, True:
+        algo.singlePrecision.setValue(singlePrecision)
+        minReqVol.append(algo._histogramRepetition(rset)[-1])
+    assert numpy.isfinite(minReqVol[1]).all()
+    assert numpy.allclose(minReqVol[1], minReqVol[0], rtol = 1e-6, atol = 0.)
+
+# vim: set ts=4 sts=4 sw=4 tw=0:
@@ -191,9 +191,9 @@ class PlotResults(object):
                 fitX0 = self._result['fitX0']
                 fitMeasVal = self._result['fitMeasValMean'][0,:]
                 if isinstance(dataset, SASData):
-                    fitX0 = np.sort(self._result['fitX0'])
-                    fitMeasVal = self._result['fitMeasValMean'][0, 
-                            np.argsort(self._result['fitX0'])]
+                    # sorted once, the fit values follow the same order
+                    order = np.argsort(fitX0)
+                    fitX0, fitMeasVal = fitX0[order], fitMeasVal[order]
                 self.plot1D(dataset,
                         fitX0, fitMeasVal, qAxis)
 
@@ -451,7 +451,7 @@ class PlotResults(object):
                             .format(name = dataset.f.name))
         try: # try to plot the background level
             qAxis.plot(dataset.x0.unit.toDisplay(fitX0),
-                       np.ones_like(fitX0) * dataset.f.unit.toDisplay(self._BG[0]),
+                       np.full_like(fitX0, dataset.f.unit.toDisplay(self._BG[0])),
                        'g-', linewidth = 3, zorder = 3,
                        label = "MC Background level:\n"
                                "        ({0:03.3g})".format(self._BG[0]))
@@ -63,7 +63,7 @@ class CylindersIsotropic(SASModel):
         qRsina = numpy.outer(dataset.q, self.radius() * sin((psi) ))
         qLcosa = numpy.outer(dataset.q, halfLength * cos((psi) ))
         fsplit = ((2.*scipy.special.j1(qRsina)/qRsina * sinc(qLcosa/pi))
-                  * sqrt(abs(sin((psi) ))[newaxis,:] + 0. * qRsina))
+                  * sqrt(abs(sin(psi)))[newaxis,:])
         #integrate over orientation
         return numpy.sqrt(numpy.mean(fsplit**2, axis=1)) # should be length q
 
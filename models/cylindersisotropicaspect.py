@@ -66,7 +66,7 @@ class CylindersIsotropic(SASModel):
         qRsina = numpy.outer(dataset.q, self.radius() * sin((psi * dToR) % 180.))
         qLcosa = numpy.outer(dataset.q, self.radius() * self.aspect() * cos((psi * dToR) % 180.))
         fsplit = ((2*scipy.special.j1(qRsina)/qRsina * sin(qLcosa)/qLcosa)
-                  * sqrt((sin(psi * dToR))[newaxis,:]%180 + 0. * qRsina))
+                  * sqrt(sin(psi * dToR) % 180.)[newaxis,:])
         #integrate over orientation
         return numpy.sqrt(numpy.mean(fsplit**2, axis=1)) #should be length q
 
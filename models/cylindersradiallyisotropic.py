@@ -39,6 +39,7 @@ class CylindersRadiallyIsotropic(SASModel):
                     displayName = "scattering length density difference",
                     valueRange = (0., numpy.inf))
     )
+    _psiGrid = None # sine and cosine of the in-plane angles, with their key
 
     def __init__(self):
         super(CylindersRadiallyIsotropic, self).__init__()
@@ -52,8 +53,7 @@ class CylindersRadiallyIsotropic(SASModel):
         #used in the equation for a cylinder from Pedersen, 1997
 
         # dToR = pi/180. #degrees to radian not necessary since unit conversion
-        psiRange = self.psiAngle.valueRange()
-        psi = numpy.linspace(psiRange[0], psiRange[1], self.psiAngleDivisions())
+        sinPsi, cosPsi = self.psiGrid()
 
         ##replicate so we cover all possible combinations of psi, phi and psi
         #psiLong=psi[ numpy.sort( numpy.array( range(
@@ -65,8 +65,13 @@ class CylindersRadiallyIsotropic(SASModel):
 
         #rotation can be used to get slightly better results, but
         #ONLY FOR RADIAL SYMMETRY, NOT SPHERICAL.
-        qRsina = numpy.outer(dataset.q, self.radius() * sin(((psi - self.psiAngle()) )))
-        qLcosa = numpy.outer(dataset.q, self.radius() * self.aspect() * cos(((psi - self.psiAngle()))))
+        # sin(psi - rot) and cos(psi - rot) from the constant grid and the
+        # angle of rotation, no trigonometric function per grid point
+        sinRot, cosRot = sin(self.psiAngle()), cos(self.psiAngle())
+        sinPsiRot = sinPsi * cosRot - cosPsi * sinRot
+        cosPsiRot = cosPsi * cosRot + sinPsi * sinRot
+        qRsina = numpy.outer(dataset.q, self.radius() * sinPsiRot)
+        qLcosa = numpy.outer(dataset.q, self.radius() * self.aspect() * cosPsiRot)
         #leave the rotation out of it for now.
         #qRsina=numpy.outer(q,radi*sin(((psi)*dToR)))
         #qLcosa=numpy.outer(q,radi*asp*cos(((psi)*dToR)))
@@ -74,6 +79,17 @@ class CylindersRadiallyIsotropic(SASModel):
         #integrate over orientation
         return numpy.sqrt(numpy.mean(fsplit**2, axis=1)) # should be length q
 
+    def psiGrid(self):
+        """Returns sine and cosine of the in-plane angles integrated over.
+        They depend on the range of psiAngle and the number of divisions
+        only and are calculated once for them."""
+        psiRange = self.psiAngle.valueRange()
+        key = (psiRange[0], psiRange[1], int(self.psiAngleDivisions()))
+        if self._psiGrid is None or self._psiGrid[0] != key:
+            psi = numpy.linspace(*key)
+            self._psiGrid = (key, sin(psi), cos(psi))
+        return self._psiGrid[1:]
+
     def volume(self):
         v = pi * self.radius()**2 * (2. * self.radius() * self.aspect())
         return v
@@ -79,6 +79,9 @@ class CylindersRadiallyIsotropicTilted(SASModel):
         # rotation can be used to get slightly better results, but
         # ONLY FOR RADIAL SYMMETRY, NOT SPHERICAL.
         fcyl = 0.
+        # the radial term does not depend on the tilt, calculated once
+        qRsina = numpy.outer(dataset.q, self.radius() * sin(psi * dToR))
+        radialTerm = 2. * scipy.special.j1(qRsina)/qRsina
         for pIdx in range(len(phiCtr)):
             # TODO: Implementing from equations 3.263 in SASfit manual
             # leave the cylinder axis arbitrary psi rotation out of it for now.
@@ -91,12 +94,11 @@ class CylindersRadiallyIsotropicTilted(SASModel):
             # cosGammaP=sin(psi*dToR)*cos(psi*dToR)*cos(phiCtr[pidX]*dToR)\
             #         + cos(psi*dToR)*sin(psi*dToR)
             # cosGammaM=
-            qRsina = numpy.outer(dataset.q, self.radius() * sin(psi * dToR))
             # approximation for small tilts, adjusts the length of the cylinder only!
             qLcosa = numpy.outer(dataset.q, self.radius() * self.aspect()
                                  * cos(phiCtr[pIdx] * dToR) * cos(psi * dToR))
 
-            fsplit = (2. * scipy.special.j1(qRsina)/qRsina * sinc(qLcosa / pi))
+            fsplit = radialTerm * sinc(qLcosa / pi)
             # integrate over orientation
             fcyl += numpy.sqrt(numpy.mean(fsplit**2, axis=1)) / len(phiCtr) # should be length q
 
@@ -9,9 +9,25 @@ from utils.parameter import FitParameter, Parameter
 from bases.algorithm import RandomUniform, RandomExponential
 from bases.model import SASModel
 from utils.units import Length, NoUnit, SLD
+from utils.jit import njit
 
 # parameters must not be inf
 
+@njit(cache = True, fastmath = True)
+def _formfactor(qr, weights):
+    """Orientation averaged form factor kernel for *qr* of shape
+    <number of q x number of orientations>, the Rayleigh function fused
+    with the weighted average over orientations by numba if available.
+    Below *qr* = 1e-4 its Taylor expansion is used."""
+    if qr.min() >= 1e-4: # usually, the guard below is not needed
+        ff = 3. * (sin(qr) - qr * cos(qr)) / (qr * qr * qr)
+    else:
+        small = (qr < 1e-4)
+        qrs = np.where(small, 1., qr)
+        ff = 3. * (sin(qrs) - qrs * cos(qrs)) / (qrs * qrs * qrs)
+        ff = np.where(small, 1. - qr * qr / 10., ff)
+    return np.sqrt((ff * ff * weights).sum(axis = 1) / weights.size)
+
 class EllipsoidsIsotropic(SASModel):
     r"""Form factor for a spheroidal structure with semi-axes a = b, c.
     c can be set to be an aspect ratio with respect to a
@@ -65,10 +81,8 @@ class EllipsoidsIsotropic(SASModel):
         intVal = np.linspace(0., pi / 2., self.intDiv())
         
         qrP = np.outer(q, rPlugin(Ra, Rc, intVal))
-        fsplit = 3.* ( sin(qrP) - qrP * cos (qrP) ) / (qrP**3.) 
-        
         # integrate over orientation
-        return np.sqrt(np.mean(fsplit**2 * sin(intVal), axis=1)) # should be length q
+        return _formfactor(qrP, sin(intVal)) # should be length q
 
     def volume(self):
         Ra = self.a()
@@ -8,6 +8,35 @@ from bases.algorithm import RandomUniform
 from utils.parameter import FitParameter, Parameter
 from bases.model import SASModel
 from utils.units import Length, NM, SLD
+from utils.jit import njit
+
+@njit(cache = True, fastmath = True)
+def _formfactor(qr):
+    """Sphere form factor kernel for arrays of *qr* of any dimension,
+    compiled to a single fused loop by numba if available.
+    Below *qr* = 1e-4 its Taylor expansion is used, avoiding the
+    cancellation towards 0/0 of the closed form.
+    This is 3 j1(qr)/qr with the spherical Bessel function j1, but
+    scipy.special.spherical_jn() is slower than sin() and cos() here."""
+    if qr.min() >= 1e-4: # usually, the guard below is not needed
+        return 3. * (sin(qr) - qr * cos(qr)) / (qr * qr * qr)
+    small = (qr < 1e-4)
+    qrs = numpy.where(small, 1., qr)
+    ff = 3. * (sin(qrs) - qrs * cos(qrs)) / (qrs * qrs * qrs)
+    return numpy.where(small, 1. - qr * qr / 10., ff)
+
+@njit(cache = True, fastmath = True)
+def _intensitySum(q, radii, weights, chunkSize):
+    """Total intensity of spheres of all *radii* with intensity *weights*
+    at *q*. The form factor and its accumulation are evaluated for
+    *chunkSize* radii at once, the intensity of each one is not kept."""
+    cumInt = numpy.zeros(q.size)
+    for start in range(0, radii.size, chunkSize):
+        stop = min(start + chunkSize, radii.size)
+        ff = _formfactor(radii[start:stop].reshape((-1, 1))
+                         * q.reshape((1, -1)))
+        cumInt += (ff * ff * weights[start:stop].reshape((-1, 1))).sum(axis = 0)
+    return cumInt
 
 class Sphere(SASModel):
     """Form factor of a sphere"""
@@ -58,9 +87,51 @@ class Sphere(SASModel):
         :math:`F(q, r) = { 3 ~ sin(qr) - qr \cdot cos(qr) \over (qr)^3 }`
         """
         q = self.getQ(dataset)
-        qr = q * self.radius() 
-        result = 3. * (sin(qr) - qr * cos(qr)) / (qr**3.)
-        return result
+        return _formfactor(q * self.radius())
+
+    def _isVectorized(self, data):
+        """Returns True if the contributions can be calculated all at once
+        by the kernels above: the radius is the only active parameter and no
+        smearing applies."""
+        return (not self.isSmeared(data) and
+                [p.name() for p in self.activeParams()] == ["radius"])
+
+    def _contributionSets(self, pset, compensationExponent):
+        """Returns the radii of the contributions *pset* and their sets of
+        volumes, weights and surfaces."""
+        radii = numpy.ascontiguousarray(pset[:, 0], dtype = float)
+        # same as volume(), absVolume(), weight() and surface() above
+        vol = (pi*4./3.) * radii**3
+        vset = vol * self.sld()**2
+        wset = vol**(2 * compensationExponent)
+        sset = 4. * pi * radii * radii
+        return radii, vset, wset, sset
+
+    def calcContributions(self, data, pset, compensationExponent = None):
+        """Calculates the intensities of all contributions in a single
+        kernel if possible, see :py:meth:`_isVectorized`. Otherwise, see
+        :py:meth:`ScatteringModel.calcContributions`."""
+        if not self._isVectorized(data):
+            return super(Sphere, self).calcContributions(data, pset,
+                            compensationExponent = compensationExponent)
+        radii, vset, wset, sset = self._contributionSets(
+                                        pset, compensationExponent)
+        q = numpy.ascontiguousarray(self.getQ(data), dtype = float).ravel()
+        ff = _formfactor(radii.reshape((-1, 1)) * q.reshape((1, -1)))
+        return ff * ff * wset.reshape((-1, 1)), vset, wset, sset
+
+    def calc(self, data, pset, compensationExponent = None):
+        """Calculates the total intensity of all contributions in a single
+        kernel if possible, see :py:meth:`_isVectorized`. Otherwise, see
+        :py:meth:`ScatteringModel.calc`."""
+        if not self._isVectorized(data):
+            return super(Sphere, self).calc(data, pset,
+                            compensationExponent = compensationExponent)
+        radii, vset, wset, sset = self._contributionSets(
+                                        pset, compensationExponent)
+        q = numpy.ascontiguousarray(self.getQ(data), dtype = float).ravel()
+        cumInt = _intensitySum(q, radii, wset, self.calcChunkSize)
+        return self.getModelData(cumInt, vset, wset, sset)
 
 Sphere.factory()
 
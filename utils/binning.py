@@ -9,6 +9,9 @@
  - :py:func:`binning1d`:
    bins the data and propagates errors, or calculates errors
    if not initially provided
+ - :py:func:`binningPlan`, :py:func:`binningWeightedPlan`:
+   Precompute the bin layout of the 1D binning routines for repeated
+   binning of intensities sampled at the same q.
  - :py:func:`binningWeighted1d`:
    Weighted binning, where the intensities of a
    pixel are divided between the two neighbouring bins depending on the
@@ -17,9 +20,35 @@
 """
 from __future__ import print_function
 
-from builtins import range
-from numpy import (zeros, mean, sqrt, std, reshape, size, linspace,
-                   argsort, ones, array, sort, diff)
+import numpy as np
+from numpy import (mean, sqrt, size, linspace, sort, diff, maximum, minimum,
+                   fmax, ravel, concatenate, searchsorted, errstate, intp)
+from utils.jit import njit
+
+# Scatter kernels of the 1D binning routines, compiled by numba if available,
+# see utils.jit. They are restricted to the two argument form of bincount()
+# supported by numba, the result is padded to the full length instead.
+
+@njit(cache = True)
+def _segmentSums(segIdx, values, numSegs):
+    """Sums of the *values* in each of *numSegs* segments, the segment of
+    each value is given by *segIdx*."""
+    sums = np.zeros(numSegs)
+    partial = np.bincount(segIdx, values)
+    sums[:partial.size] = partial
+    return sums
+
+@njit(cache = True)
+def _segmentStats(segIdx, values, numSegs):
+    """Number of *values*, their sums and the sums of their squared
+    deviations from the mean in each of *numSegs* segments, the segment of
+    each value is given by *segIdx*. Empty segments have a mean of zero."""
+    count = np.zeros(numSegs)
+    partial = np.bincount(segIdx)
+    count[:partial.size] = partial
+    sums = _segmentSums(segIdx, values, numSegs)
+    dev = values - (sums / np.maximum(count, 1.))[segIdx]
+    return count, sums, _segmentSums(segIdx, dev * dev, numSegs)
 
 def binningArray(q, psi, intensity, error, s = 2):
     """This function applies a simple s-by-s binning routine on images.
@@ -41,33 +70,63 @@ def binningArray(q, psi, intensity, error, s = 2):
         # trim edge
         for it in list(ddi.keys()):
             ddi[it] = ddi[it][:, 1:]
-    # now we can do n-by-n binning
-    sq = q.shape
-    qo = zeros((sq[0]/s, sq[1]/s))
-    ddo = {'q': qo.copy(), 'psi': qo.copy(),
-           'intensity': qo.copy(), 'error': qo.copy()}
-    for it in 'q', 'psi', 'intensity':
-        for ri in range(sq[0]/s):
-            for ci in range(sq[1]/s):
-                ddo[it][ri, ci] = mean(
-                        ddi[it][s*ri:(s*ri+s), s*ci:(s*ci+s)])
-        
-    for ri in range(sq[0]/s):
-        for ci in range(sq[1]/s):
-            meanE = sqrt(sum((
-                        ddi['error'][s*ri:(s*ri+s), s*ci:(s*ci+s)])**2
-                    ))/s**2
-            # sample standard deviation
-            stdI = std(ddi['intensity'][s*ri:(s*ri+s), s*ci:(s*ci+s)])
-            # stdI=0
-            ddo['error'][ri, ci] = max((meanE, stdI))
+    # now we can do n-by-n binning of the trimmed arrays:
+    # each s-by-s block gets its own pair of axes (1, 3), remaining edge
+    # pixels not filling a block are ignored
+    sq = ddi['q'].shape
+    nr, nc = sq[0] // s, sq[1] // s
+    def blocks(values):
+        return values[:nr*s, :nc*s].reshape(nr, s, nc, s)
+    ddo = dict()
+    for it in 'q', 'psi':
+        ddo[it] = blocks(ddi[it]).mean(axis = (1, 3))
+    # the intensity statistics share the block means
+    inten = blocks(ddi['intensity'])
+    ddo['intensity'] = inten.mean(axis = (1, 3))
+    dev = inten - ddo['intensity'][:, None, :, None]
+    # sample standard deviation
+    stdI = sqrt((dev * dev).mean(axis = (1, 3)))
+    # propagated uncertainty of the block mean
+    err = blocks(ddi['error'])
+    meanE = sqrt((err * err).sum(axis = (1, 3))) / (s * s)
+    ddo['error'] = maximum(meanE, stdI)
     return ddo
 
-def binning1d(q, intensity, error = None, numBins = 200, stats = 'std'):
+def binningPlan(q, numBins = 200):
+    """Precomputes the bin layout of :py:func:`binning1d` for the
+    sampling vector *q*. It can be passed on as *plan* to bin several
+    intensities sampled at the same *q* without assigning the bins again.
+    Returns a tuple of the mask of values within the bins, the bin segment
+    index of each of these values and the bin centres.
+    """
+    q = ravel(q)
+    # define the bin edges and centres, and find out the stepsize while
+    # we're at it. Probably, there is no need for knowing the edges...
+    qbinEdges = linspace(q.min(), q.max(), numBins + 1)
+    stepsize = qbinEdges[1] - qbinEdges[0]
+    qbinCenters = linspace(q.min() + 0.5*stepsize,
+                           q.max() - 0.5*stepsize, numBins)
+    # Each bin collects the values in (centre - stepsize, centre + stepsize],
+    # which overlaps half of both neighbouring bins. Split the q range
+    # at the bin centres into segments and join two adjacent segments per
+    # bin. Segment k covers (centre[k-1], centre[k]].
+    segEdges = concatenate(([qbinCenters[0] - stepsize], qbinCenters,
+                            [qbinCenters[-1] + stepsize]))
+    inRange = (q > segEdges[0]) & (q <= segEdges[-1])
+    q = q[inRange]
+    segIdx = minimum(((q - segEdges[0]) / stepsize).astype(intp), numBins)
+    # correct for rounding of values close to the segment edges
+    segIdx -= q <= segEdges[segIdx]
+    segIdx += q > segEdges[segIdx + 1]
+    return inRange, segIdx, qbinCenters
+
+def binning1d(q, intensity, error = None, numBins = 200, stats = 'std',
+              plan = None):
     """An unweighted binning routine.
     The intensities are sorted across bins of equal size. If provided error
     is empty, the standard deviation of the intensities in the bins are
-    computed.
+    computed. A *plan* from :py:func:`binningPlan` for the same *q* and
+    *numBins* saves its calculation.
     """
     
     # Let's make sure the input is consistent
@@ -78,77 +137,102 @@ def binning1d(q, intensity, error = None, numBins = 200, stats = 'std'):
         print("Size of error is not identical to q and intensity")
         return
 
-    #flatten q, intensity and error
-    q = reshape(q, size(q), 0)
-    intensity = reshape(intensity, size(intensity), 0)
+    #flatten intensity and error
+    intensity = ravel(intensity)
     if error is None:
         error = []
-    error = reshape(error, size(error), 0)
+    error = ravel(error)
 
-    # define the bin edges and centres, and find out the stepsize while
-    # we're at it. Probably, there is no need for knowing the edges...
-    qbinEdges = linspace(q.min(), q.max(), numBins + 1)
-    stepsize = qbinEdges[1] - qbinEdges[0]
-    qbinCenters = linspace(q.min() + 0.5*stepsize,
-                           q.max() - 0.5*stepsize, numBins)
-    
-    # sort q, let intensity and error follow sort
-    sortInd = argsort(q, axis = None)
-    q = q[sortInd]
-    intensity = intensity[sortInd]
-    ibin = zeros(numBins)
-    sdbin = zeros(numBins)    
-    sebin = zeros(numBins)    
+    if plan is None:
+        plan = binningPlan(q, numBins)
+    inRange, segIdx, qbinCenters = plan
+    intensity = intensity[inRange]
     if size(error) != 0:
-        error = error[sortInd]
+        error = error[inRange]
+    numSegs = size(qbinCenters) + 1
 
-    # now we can fill the bins
-    for bini in range(numBins):
-        # limit ourselves to only the bits we're interested in:
-        limMask = ((q  > (qbinCenters[bini] - stepsize)) &
-                          (q <= (qbinCenters[bini] + stepsize)))
-        iToBin = intensity[limMask]
-        if size(error) != 0:
-            eToBin = sum(error[limMask])
+    def binSums(values):
+        return values[:-1] + values[1:]
 
-        # find out the weighting factors for each (q, intensity, error)-pair
-        # in the array  
-        weightFactor = ones(size(iToBin))
+    # count, sum and squared deviations from the mean of each segment
+    segCount, segSums, segM2 = _segmentStats(segIdx, intensity, numSegs)
+    segMean = segSums / maximum(segCount, 1.)
 
+    with errstate(divide = 'ignore', invalid = 'ignore'):
+        count = binSums(segCount)
         # sum the intensities in one bin and normalize by number of pixels
-        ibin[bini] = sum(iToBin)/sum(weightFactor)
+        ibin = binSums(segSums) / count
+        # sum of squared deviations from the bin mean, combined pairwise
+        # from the segments to avoid cancellation in E[X^2]-E[X]^2
+        meanDiff = segMean[:-1] - segMean[1:]
+        m2 = (binSums(segM2) +
+              segCount[:-1] * segCount[1:] / count * meanDiff * meanDiff)
+        # according to the definition of sample-standard deviation
+        sdbin = sqrt(m2 / (count - 1))
 
         # now we deal with the Errors:
         if (size(error) != 0):
             # if we have errors supplied from outside
             # standard error calculation:
-            sebin[bini] = (sqrt(sum(eToBin**2 * weightFactor))/
-                            sum(weightFactor))
+            sebin = sqrt(binSums(_segmentSums(segIdx, error * error,
+                                              numSegs))) / count
             if stats == 'auto':
-                # according to the definition of sample-standard deviation
-                sdbin[bini] = sqrt(sum((
-                                iToBin - ibin[bini])**2 * weightFactor
-                                   )/(sum(weightFactor) - 1))
                 # maximum between standard error and Poisson statistics
-                sebin[bini] = array([
-                            sebin[bini],
-                            sdbin[bini] / sqrt(sum(weightFactor))]).max()
-        else:           
-            # calculate the standard deviation of the intensity in the bin
-            # both for samples with supplied error as well as for those where
-            # the error is supposed to be calculated
-            # according to the definition of sample-standard deviation
-            sdbin[bini] = sqrt(sum(
-                                (iToBin-ibin[bini])**2 * weightFactor
-                                )/(sum(weightFactor) - 1))
+                sebin = fmax(sebin, sdbin / sqrt(count))
+        else:
             # calculate standard error by dividing the standard error by the
             # square root of the number of measurements
-            sebin[bini] = sdbin[bini]/sqrt(sum(weightFactor))
+            sebin = sdbin / sqrt(count)
 
     return qbinCenters, ibin, sebin
 
+def binningWeightedPlan(q, numBins = 200):
+    """Precomputes the bin layout of :py:func:`binningWeighted1d` for the
+    sampling vector *q*. It can be passed on as *plan* to bin several
+    intensities sampled at the same *q* without assigning the bins again.
+    *numBins* is the number of bins or an array of equidistant bin centres.
+    Returns a tuple of the mask of pixels within the bins, the index of the
+    left of both bins of each pixel within the bins padded by one on each
+    side, the weights of the pixels for their left and right bins and the
+    bin centres, or None if the bin centres do not overlap with *q*.
+    """
+    q = ravel(q)
+    if size(numBins) == 1:
+        # define the bin edges and centres, and find out the stepsize while
+        # we're at it. Probably, there is no need for knowing the edges...
+        dummy, stepsize = linspace(q.min(), q.max(),
+                                   numBins + 1, retstep = True)
+        qBinCenters = linspace(q.min() + 0.5*stepsize,
+                               q.max() - 0.5*stepsize, numBins)
+    else:
+        if (q.min() > numBins.max() or
+            q.max() < numBins.min()):
+            print ("Bin centres supplied do not overlap with the q-range, "
+                   "cannot continue")
+            return
+        qBinCenters = sort(numBins)
+        stepsize = mean(diff(qBinCenters))
+        numBins = size(qBinCenters)
+
+    # Every pixel lies between two neighbouring bin centres and its intensity
+    # is divided between both of them. Pad the centres by one bin on each
+    # side for the pixels beyond the outermost centres.
+    centres = concatenate(([qBinCenters[0] - stepsize], qBinCenters,
+                           [qBinCenters[-1] + stepsize]))
+    left = searchsorted(centres, q, side = 'left') - 1
+    inRange = (left >= 0) & (left < numBins + 1)
+    left, q = left[inRange], q[inRange]
+    right = left + 1
+    # find out the weighting factors for each q in the array, for both of
+    # its bins
+    wLeft = 1 - (q - centres[left])/stepsize
+    wLeft[q > centres[left] + stepsize] = 0.
+    wRight = 1 - (centres[right] - q)/stepsize
+    wRight[q <= centres[right] - stepsize] = 0.
+    return inRange, left, wLeft, wRight, qBinCenters
+
 def binningWeighted1d(q, intensity, error = None,
-                      numBins = 200, stats = 'se'):
+                      numBins = 200, stats = 'se', plan = None):
     """Implementation of the binning routine written in Matlab.
     The intensities are divided across the q-range in bins of equal size.
     The intensities of a pixel are divided between the two neighbouring bins
@@ -168,6 +252,8 @@ def binningWeighted1d(q, intensity, error = None,
         counted.
     *stats*: Can be set to 'auto'. This takes the maximum error between
         supplied Poisson statistics error-based errors or the standard error.
+    *plan*: the result of :py:func:`binningWeightedPlan` for the same *q*
+        and *numBins*, saves its calculation.
 
     Written by Brian R. Pauw, 2011, released under BSD open source license.
     """
@@ -197,78 +283,56 @@ def binningWeighted1d(q, intensity, error = None,
         print ("numBins is larger than one value. Assuming that an "
                "equidistant list of bin centres has been supplied")
 
-    # flatten q, intensity and error
-    q = reshape(q, size(q), 0)
-    intensity = reshape(intensity, size(intensity), 0)
+    # flatten intensity and error
+    intensity = ravel(intensity)
     if error is None:
         error = []
-    error = reshape(error, size(error), 0)
-    
-    if size(numBins) == 1:
-        # define the bin edges and centres, and find out the stepsize while
-        # we're at it. Probably, there is no need for knowing the edges...
-        dummy, stepsize = linspace(q.min(), q.max(),
-                                   numBins + 1, retstep = True)
-        qBinCenters = linspace(q.min() + 0.5*stepsize,
-                               q.max() - 0.5*stepsize, numBins)
-    else:
-        if (q.min() > numBins.max() or
-            q.max() < numBins.min()):
-            print ("Bin centres supplied do not overlap with the q-range, "
-                   "cannot continue")
-            return
-        qBinCenters = sort(numBins)
-        stepsize = mean(diff(qBinCenters))
-        numBins = size(qBinCenters)
+    error = ravel(error)
 
-    # initialize output matrices
-    ibin = zeros(numBins)
-    sdbin = zeros(numBins)    
-    sebin = zeros(numBins)    
+    if plan is None:
+        plan = binningWeightedPlan(q, numBins)
+        if plan is None:
+            return
+    inRange, left, wLeft, wRight, qBinCenters = plan
+    numBins = size(qBinCenters)
+    right = left + 1
+    intensity = intensity[inRange]
+    if (size(error) != 0):
+        error = error[inRange]
 
-    # now we can fill the bins
-    for bini in range(numBins):
-        # limit ourselves to only the bits we're interested in:
-        limMask = (q  > (qBinCenters[bini] - stepsize) and
-                          q <= (qBinCenters[bini] + stepsize))
-        qToBin = q[limMask]
-        iToBin = intensity[limMask]
-        if (size(error) != 0):
-            eToBin = error[limMask]
+    def binSums(leftWeights, rightWeights):
+        # sum the weights in each bin, dropping the padding
+        sums = (_segmentSums(left, leftWeights, numBins + 2) +
+                _segmentSums(right, rightWeights, numBins + 2))
+        return sums[1:-1]
 
-        # find out the weighting factors for each (q, intensity, error)-pair
-        # in the array
-        qDist = abs(qToBin - qBinCenters[bini])
-        weightFactor = (1 - qDist/stepsize)
+    def weightedSums(leftValues, rightValues):
+        return binSums(leftValues * wLeft, rightValues * wRight)
 
+    with errstate(divide = 'ignore', invalid = 'ignore'):
+        # total weight of each bin
+        weightSum = binSums(wLeft, wRight)
         # sum the intensities in one bin
-        ibin[bini] = sum(iToBin * weightFactor)/sum(weightFactor)
+        ibin = weightedSums(intensity, intensity) / weightSum
+        # according to the definition of sample-standard deviation
+        ibinPad = concatenate(([0.], ibin, [0.]))
+        devLeft = intensity - ibinPad[left]
+        devRight = intensity - ibinPad[right]
+        sdbin = sqrt(weightedSums(devLeft * devLeft, devRight * devRight)
+                     / (weightSum - 1))
 
         # now we deal with the Errors:
         if (size(error) != 0): # if we have errors supplied from outside
             # standard error calculation:
-            sebin[bini] = (sqrt(sum(eToBin**2 * weightFactor))
-                            / sum(weightFactor))
+            errSqr = error * error
+            sebin = sqrt(weightedSums(errSqr, errSqr)) / weightSum
             if stats == 'auto':
-                # according to the definition of sample-standard deviation
-                sdbin[bini] = sqrt(sum(
-                    (iToBin - ibin[bini])**2 * weightFactor
-                                    )/(sum(weightFactor) - 1))
                 # maximum between standard error and Poisson statistics
-                sebin[bini] = array([
-                                sebin[bini],
-                                sdbin[bini] / sqrt(sum(weightFactor))]).max()
-        else:           
-            # calculate the standard deviation of the intensity in the bin
-            # both for samples with supplied error as well as for those where
-            # the error is supposed to be calculated
-            # according to the definition of sample-standard deviation
-            sdbin[bini] = sqrt(sum(
-                        (iToBin - ibin[bini])**2 * weightFactor
-                                )/(sum(weightFactor)-1))
+                sebin = fmax(sebin, sdbin / sqrt(weightSum))
+        else:
             # calculate standard error by dividing the standard error by the
             # square root of the number of measurements
-            sebin[bini] = sdbin[bini]/sqrt(sum(weightFactor))
+            sebin = sdbin / sqrt(weightSum)
     return qBinCenters, ibin, sebin
  
 # vim: set ts=4 sts=4 sw=4 tw=0:
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# utils/binning_test.py
+
+from __future__ import absolute_import # PEP328
+from builtins import range
+import numpy
+from numpy.testing import assert_allclose
+from utils.binning import (binningArray, binning1d, binningWeighted1d,
+                           binningPlan, binningWeightedPlan, _segmentSums,
+                           _segmentStats)
+
+def getSparseData(count = 40, seed = 1):
+    """Unsorted q with gaps, more bins than values leave some empty and
+    some with a single value only."""
+    rs = numpy.random.RandomState(seed)
+    q = numpy.concatenate((rs.uniform(0., 1., count // 2),
+                           rs.uniform(2., 3., count - count // 2)))
+    rs.shuffle(q)
+    intensity = rs.uniform(1., 10., count)
+    error = rs.uniform(.1, 1., count)
+    return q, intensity, error
+
+def referenceBinning1d(q, intensity, error, numBins, stats):
+    """Straightforward loop over the bins of binning1d()."""
+    step = (q.max() - q.min()) / numBins
+    centres = numpy.linspace(q.min() + .5 * step, q.max() - .5 * step,
+                             numBins)
+    ibin, sebin, counts = [], [], []
+    for centre in centres:
+        inBin = (q > centre - step) & (q <= centre + step)
+        count, values = inBin.sum(), intensity[inBin]
+        counts.append(count)
+        if not count:
+            ibin.append(numpy.nan)
+            sebin.append(numpy.nan)
+            continue
+        ibin.append(values.mean())
+        sd = numpy.nan
+        if count > 1:
+            sd = values.std(ddof = 1)
+        if error is None:
+            sebin.append(sd / numpy.sqrt(count))
+            continue
+        se = numpy.sqrt((error[inBin]**2).sum()) / count
+        if stats == 'auto':
+            se = numpy.fmax(se, sd / numpy.sqrt(count))
+        sebin.append(se)
+    return centres, numpy.array(ibin), numpy.array(sebin), numpy.array(counts)
+
+def referenceBinningWeighted1d(q, intensity, error, numBins, stats):
+    """Straightforward loop over the bins of binningWeighted1d(), each
+    value is weighted by its distance to the bin centre."""
+    step = (q.max() - q.min()) / numBins
+    centres = numpy.linspace(q.min() + .5 * step, q.max() - .5 * step,
+                             numBins)
+    ibin, sebin = [], []
+    for centre in centres:
+        inBin = (q > centre - step) & (q <= centre + step)
+        weights = 1. - abs(q[inBin] - centre) / step
+        values, weightSum = intensity[inBin], weights.sum()
+        mean = (values * weights).sum() / weightSum
+        sd = numpy.sqrt((weights * (values - mean)**2).sum()
+                        / (weightSum - 1.))
+        ibin.append(mean)
+        if error is None:
+            sebin.append(sd / numpy.sqrt(weightSum))
+            continue
+        se = numpy.sqrt((weights * error[inBin]**2).sum()) / weightSum
+        if stats == 'auto':
+            se = numpy.fmax(se, sd / numpy.sqrt(weightSum))
+        sebin.append(se)
+    return centres, numpy.array(ibin), numpy.array(sebin)
+
+def testSegmentSums():
+    rs = numpy.random.RandomState(2)
+    numSegs = 7
+    # no value in the first, a single one in the last but one segment
+    segIdx = numpy.array([1, 1, 2, 3, 3, 3, 5, 2, 1])
+    values = rs.uniform(size = len(segIdx))
+    count, sums, m2 = _segmentStats(segIdx, values, numSegs)
+    assert_allclose(sums, _segmentSums(segIdx, values, numSegs))
+    for seg in range(numSegs):
+        inSeg = values[segIdx == seg]
+        assert count[seg] == len(inSeg)
+        assert_allclose(sums[seg], inSeg.sum(), atol = 1e-15)
+        if len(inSeg):
+            assert_allclose(m2[seg], ((inSeg - inSeg.mean())**2).sum(),
+                            atol = 1e-15)
+        else:
+            assert m2[seg] == 0.
+
+def testBinning1d():
+    q, intensity, error = getSparseData()
+    numBins = 60
+    for err in error, None:
+        for stats in 'std', 'auto':
+            centres, ibin, sebin, counts = referenceBinning1d(
+                    q, intensity, err, numBins, stats)
+            # empty and single value bins are covered
+            assert (counts == 0).any() and (counts == 1).any()
+            result = binning1d(q, intensity, err, numBins, stats)
+            assert_allclose(result[0], centres)
+            assert_allclose(result[1], ibin)
+            assert_allclose(result[2], sebin)
+
+def testBinningWeighted1d():
+    q, intensity, error = getSparseData()
+    numBins = 60
+    with numpy.errstate(divide = 'ignore', invalid = 'ignore'):
+        for err in error, None:
+            for stats in 'se', 'auto':
+                reference = referenceBinningWeighted1d(
+                        q, intensity, err, numBins, stats)
+                result = binningWeighted1d(q, intensity, err, numBins, stats)
+                for res, ref in zip(result, reference):
+                    assert_allclose(res, ref)
+
+def testBinningWeightedOnEdges():
+    """Values on the bin centres and edges are weighted like the loop does,
+    with a weight of zero at the edges."""
+    q = numpy.linspace(0., 1., 41)
+    intensity = numpy.arange(len(q), dtype = float)
+    with numpy.errstate(divide = 'ignore', invalid = 'ignore'):
+        for numBins in 10, 20, 40:
+            result = binningWeighted1d(q, intensity, numBins = numBins)
+            reference = referenceBinningWeighted1d(q, intensity, None,
+                                                   numBins, 'se')
+            for res, ref in zip(result, reference):
+                assert_allclose(res, ref)
+
+def testBinningPlan():
+    """A precomputed plan bins other intensities at the same q the same
+    way."""
+    q, intensity, error = getSparseData()
+    numBins = 30
+    plan, weightedPlan = (binningPlan(q, numBins),
+                          binningWeightedPlan(q, numBins))
+    with numpy.errstate(divide = 'ignore', invalid = 'ignore'):
+        for factor in 1., 2.5:
+            for res, ref in zip(
+                    binning1d(q, intensity * factor, error, numBins,
+                              plan = plan),
+                    binning1d(q, intensity * factor, error, numBins)):
+                assert_allclose(res, ref)
+            for res, ref in zip(
+                    binningWeighted1d(q, intensity * factor, error, numBins,
+                                      plan = weightedPlan),
+                    binningWeighted1d(q, intensity * factor, error, numBins)):
+                assert_allclose(res, ref)
+    # bin centres without overlap
+    assert binningWeightedPlan(q, numpy.array((5., 6., 7.))) is None
+
+def referenceBinningArray(q, psi, intensity, error, s):
+    """The loop over s-by-s blocks binningArray() used before, on arrays
+    with an odd first row and column trimmed already."""
+    nr, nc = q.shape[0] // s, q.shape[1] // s
+    ddo = dict((it, numpy.zeros((nr, nc)))
+               for it in ('q', 'psi', 'intensity', 'error'))
+    ddi = {'q': q, 'psi': psi, 'intensity': intensity}
+    for ri in range(nr):
+        for ci in range(nc):
+            block = (slice(s*ri, s*ri + s), slice(s*ci, s*ci + s))
+            for it in 'q', 'psi', 'intensity':
+                ddo[it][ri, ci] = numpy.mean(ddi[it][block])
+            meanE = numpy.sqrt(numpy.sum(error[block]**2)) / s**2
+            stdI = numpy.std(intensity[block])
+            ddo['error'][ri, ci] = max((meanE, stdI))
+    return ddo
+
+def testBinningArray():
+    """Blocks not filling the remaining rows and columns are dropped."""
+    rs = numpy.random.RandomState(3)
+    for shape in (12, 12), (11, 14), (13, 17), (9, 8):
+        arrays = [rs.uniform(.1, 1., shape) for dummy in range(4)]
+        # the odd first row and column is trimmed before binning
+        trim = (slice(shape[0] % 2, None), slice(shape[1] % 2, None))
+        trimmed = [values[trim] for values in arrays]
+        for s in 2, 3:
+            result = binningArray(*(arrays + [s]))
+            reference = referenceBinningArray(*(trimmed + [s]))
+            for it in 'q', 'psi', 'intensity', 'error':
+                assert result[it].shape == (trimmed[0].shape[0] // s,
+                                            trimmed[0].shape[1] // s)
+                assert_allclose(result[it], reference[it])
+
+# vim: set ts=4 sts=4 sw=4 tw=0:
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# utils/jit.py
+
+"""
+Optional just-in-time compilation of numerical kernels.
+
+If `numba <http://numba.pydata.org>`_ is available, :py:func:`njit` compiles
+the decorated function to machine code. Otherwise, the function is returned
+unchanged and runs as usual. Kernels decorated this way should be written
+with numpy array expressions which work in both cases::
+
+    from utils.jit import njit
+
+    @njit(cache = True)
+    def kernel(a, b):
+        return (a * b).sum()
+"""
+
+from __future__ import absolute_import # PEP328
+from builtins import range
+
+try:
+    import numba
+    from numba import prange
+    hasNumba = True
+except ImportError:
+    numba = None
+    prange = range # serial fallback for numba.prange
+    hasNumba = False
+
+def njit(*args, **kwargs):
+    """Decorator compiling a function in numba's nopython mode if numba is
+    available. Accepts the same arguments as :py:func:`numba.njit` and
+    can be used with or without them."""
+    if hasNumba:
+        return numba.njit(*args, **kwargs)
+    if len(args) == 1 and callable(args[0]) and not len(kwargs):
+        return args[0] # used as plain @njit
+    def decorator(func):
+        return func
+    return decorator
+
+# vim: set ts=4 sts=4 sw=4 tw=0:
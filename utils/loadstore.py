@@ -13,16 +13,13 @@ from utils import mcopen
 
 def pickleLoad(filename):
     """Loads data from a pickle file"""
-    fh = mcopen(filename)
-    output = pickle.load(fh)
-    fh.close()
-    return output
+    with mcopen(filename, 'rb') as fh:
+        return pickle.load(fh)
 
 def pickleStore(filename, somedata):
-    """Writes python object to a file."""
-    fh = mcopen(filename, 'w')
-    pickle.dump(somedata, fh)
-    fh.close()
-    return
+    """Writes python object to a file, in the binary format of the highest
+    protocol available."""
+    with mcopen(filename, 'wb') as fh:
+        pickle.dump(somedata, fh, protocol = pickle.HIGHEST_PROTOCOL)
 
 # vim: set ts=4 sts=4 sw=4 tw=0:
@@ -13,12 +13,61 @@ from bases.algorithm import (ParameterBase, ParameterFloat,
                              ParameterLog, ParameterString)
 from bases.algorithm import Parameter
 from bases.dataset import DataSet, DisplayMixin
+from utils.jit import njit, prange, hasNumba
 
 def _makeProperty(varName):
     def getter(selforcls):
         return getattr(selforcls, varName)
     return property(getter)
 
+@njit(cache = True)
+def _rangeMoments(contribs, fraction, low, high):
+    """Total fraction, mean, variance, skew and kurtosis of the *contribs*
+    within (*low*, *high*) for each repetition, weighted by *fraction*.
+    Both are of shape <number of contributions x number of repetitions>,
+    the result is of shape <5 x number of repetitions>. Contributions out of
+    range are weighted by zero, the moments of repetitions without any
+    contribution in range are zero. Compiled by numba if available, see
+    utils.jit."""
+    valid = (contribs > low) & (contribs < high)
+    frac = np.where(valid, fraction, 0.)
+    val = frac.sum(axis = 0)
+    mu = (np.where(valid, contribs, 0.) * frac).sum(axis = 0)
+    mu = np.where(val != 0, mu / val, mu)
+    dev = np.where(valid, contribs - mu, 0.)
+    devFrac = dev * dev * frac # reused for higher moments
+    var = devFrac.sum(axis = 0) / val
+    # common denominator of the higher moments, sigma^2 times the total
+    absVar = np.abs(var)
+    valVar = val * absVar
+    devFrac *= dev
+    skw = devFrac.sum(axis = 0) / (valVar * np.sqrt(absVar))
+    devFrac *= dev
+    krt = devFrac.sum(axis = 0) / (valVar * absVar)
+    moments = np.empty((5, contribs.shape[1]))
+    moments[0], moments[1], moments[2] = val, mu, var
+    moments[3], moments[4] = skw, krt
+    # what to do if validRange is empty?
+    empty = valid.sum(axis = 0) == 0
+    for i in range(5):
+        row = moments[i]
+        row[empty] = 0.
+    return moments
+
+@njit(cache = True, parallel = True)
+def _rangeMomentsParallel(contribs, fraction, low, high):
+    """Same as _rangeMoments() but each repetition is reduced on its own,
+    in parallel threads by numba's prange."""
+    moments = np.empty((5, contribs.shape[1]))
+    for rep in prange(contribs.shape[1]):
+        moments[:, rep:rep + 1] = _rangeMoments(contribs[:, rep:rep + 1],
+                                            fraction[:, rep:rep + 1], low, high)
+    return moments
+
+# repetitions are independent: reduced in parallel threads if compiled,
+# without numba a loop over them would run in the interpreter
+_momentsKernel = _rangeMomentsParallel if hasNumba else _rangeMoments
+
 class Moments(object):
     _intensity  = None # partial intensity
     _total      = None
@@ -58,9 +107,12 @@ class Moments(object):
         return str(self)
 
     def __init__(self, contribs, paramIndex, valueRange, fraction, algo = None):
-        self._setValidRange(contribs[:, paramIndex, :], valueRange)
-        self._calcMoments(contribs[:, paramIndex, :], fraction)
+        testfor(contribs.ndim == 3, ValueError)
+        # the moments mask the value range themselves, the explicit mask of
+        # valid contributions is needed for partial intensities only
+        self._calcMoments(contribs[:, paramIndex, :], valueRange, fraction)
         if algo is not None:
+            self._setValidRange(contribs[:, paramIndex, :], valueRange)
             scalingFactors = algo.result[paramIndex]['scalingFactors']
             self._calcPartialIntensities(contribs, scalingFactors, algo)
 
@@ -71,55 +123,37 @@ class Moments(object):
                     <number of contributions x number of repetitions>
         """
         testfor(contribs.ndim == 2, ValueError)
-        numContribs, numReps = contribs.shape
-        self._validRange = np.zeros_like(contribs.T, dtype = bool)
-        for ri in range(numReps):
-            # the single set of R for this calculation
-            rset = contribs[:, ri]
-            self._validRange[ri] = ((rset > min(valueRange))
-                                  * (rset < max(valueRange)))
+        # for all repetitions at once, one row each
+        self._validRange = ((contribs.T > min(valueRange))
+                            & (contribs.T < max(valueRange)))
 
-    def _calcMoments(self, contribs, fraction):
+    def _calcMoments(self, contribs, valueRange, fraction):
         """Calculates the moments of the distribution of the current
         particular (implied) parameter.
 
         - *contribs*: parameter value sets of shape
                       <number of contributions x number of repetitions>
+        - *valueRange*: the parameter range of interest
         - *fraction*: number or volume fraction
 
         """
         numContribs, numReps = contribs.shape
-        val = np.zeros(numReps)
-        mu  = np.zeros(numReps)
-        var = np.zeros(numReps)
-        skw = np.zeros(numReps)
-        krt = np.zeros(numReps)
-        # loop over each repetition
-        for ri in range(numReps):
-            # the single set of R for this calculation
-            if not any(self._validRange[ri]):
-                continue # what to do if validRange is empty?
-            rset = contribs[self._validRange[ri], ri]
-            frac = fraction[self._validRange[ri], ri]
-            val[ri] = sum(frac)
-            mu[ri]  = sum(rset * frac)
-            if 0 != sum(frac):
-                mu[ri] /= sum(frac)
-            var[ri] = sum( (rset-mu[ri])**2 * frac )/sum(frac)
-            sigma   = np.sqrt(abs(var[ri]))
-            skw[ri] = ( sum( (rset-mu[ri])**3 * frac )
-                     / (sum(frac) * sigma**3))
-            krt[ri] = ( sum( (rset-mu[ri])**4 * frac )
-                     / (sum(frac) * sigma**4))
+        # for all repetitions at once, one column each, in double precision
+        # also for single precision input
+        fraction = np.broadcast_to(fraction, contribs.shape)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            moments = _momentsKernel(
+                    np.asarray(contribs, dtype = float),
+                    np.asarray(fraction, dtype = float),
+                    float(min(valueRange)), float(max(valueRange)))
 
         DDoF = 0
         if numReps > 1: # prevent division by zero in numpy.std()
             DDoF = 1
-        self._total    = (val.mean(), val.std(ddof = DDoF))
-        self._mean     = ( mu.mean(),  mu.std(ddof = DDoF))
-        self._variance = (var.mean(), var.std(ddof = DDoF))
-        self._skew     = (skw.mean(), skw.std(ddof = DDoF))
-        self._kurtosis = (krt.mean(), krt.std(ddof = DDoF))
+        # mean and standard deviation of all moments over the repetitions
+        stats = zip(moments.mean(axis = 1), moments.std(axis = 1, ddof = DDoF))
+        (self._total, self._mean, self._variance, self._skew,
+         self._kurtosis) = stats
 
     #partial intensities not parameter-specific. Move to model/histogram?
     def _calcPartialIntensities(self, contribs, scalingFactors, algo):
@@ -368,11 +402,8 @@ class Histogram(DataSet, DisplayMixin):
     def _setXMean(self):
         if self.xLowerEdge is None:
             return
-        # NOTE: isn't this the same as:
-        # self.xWidth * .5 + self.xLowerEdge
-        self._xMean = np.zeros(self.binCount)
-        for i in range(self.binCount):
-            self._xMean[i] = self.xLowerEdge[i:i+2].mean()
+        # the center between both edges of each bin
+        self._xMean = (self.xLowerEdge[:-1] + self.xLowerEdge[1:]) * .5
 
     @property
     def xWidth(self):
@@ -400,22 +431,26 @@ class Histogram(DataSet, DisplayMixin):
         if allObservability is None:
             return
         testfor(allObservability.shape[0] == self.binCount, ValueError)
-        for bi in range(self.binCount):
-            # for observabilities over all repetitions select the largest
-            obs = allObservability[bi, :]
-            try:
-                self._observability[bi] = obs[obs < np.inf].max()
-            except ValueError: # obs[obs < np.inf] can be empty
-                pass
+        # for observabilities over all repetitions select the largest,
+        # ignoring infinite (and NaN) ones
+        largest = np.where(allObservability < np.inf, allObservability,
+                           -np.inf).max(axis = 1)
+        # bins without any finite observability remain zero
+        valid = (largest > -np.inf)
+        self._observability[valid] = largest[valid]
 
     @property
     def moments(self):
         return self._moments
 
-    def _binMask(self, bini, parValues):
-        # indexing which contributions fall into the radius bin
-        return (  (parValues >= self.xLowerEdge[bini])
-                * (parValues <  self.xLowerEdge[bini + 1]))
+    def _binIndices(self, parValues):
+        """Returns the index of the bin each of the given parameter values
+        falls into, -1 for values outside of the histogram range. Accepts
+        arrays of any shape, of all repetitions at once."""
+        # bin i contains values in [xLowerEdge[i], xLowerEdge[i+1])
+        binIdx = np.searchsorted(self.xLowerEdge, parValues, side = 'right') - 1
+        binIdx[binIdx >= self.binCount] = -1
+        return binIdx
 
     def calc(self, contribs, paramIndex, fractions):
         self._setXLowerEdge()
@@ -423,59 +458,48 @@ class Histogram(DataSet, DisplayMixin):
 
     def _calcRepetitions(self, contribs, paramIndex, fractions):
         numContribs, dummy, numReps = contribs.shape
-        binLst, obsLst, cdfLst = [], [], []
         fractions, minReq = fractions[self.yweight]
-        for ri in range(numReps):
-            parValues = contribs[:, paramIndex, ri]
-            bins, binObs, cdf = self._calcBins(
-                    contribs, parValues, fractions[:, ri], minReq[:, ri])
-            binLst.append(bins)
-            obsLst.append(binObs)
-            cdfLst.append(cdf)
+        # indexing which contributions fall into which bin, for all
+        # repetitions: <number of contributions x number of repetitions>
+        binIdx = self._binIndices(contribs[:, paramIndex, :])
+        inRange = (binIdx >= 0)
+        # histogram the fractions of all repetitions at once, each bin of
+        # each repetition gets its own index into the flat bins array
+        flatIdx = (binIdx * numReps + np.arange(numReps))[inRange]
+        bins = self._binSums(flatIdx, fractions[inRange], numReps)
+        bins[np.isnan(bins)] = 0.
         # set final result: y values, CDF and observability of all bins
-        self._bins = VectorResult(np.vstack(binLst).T)
-        self._cdf = VectorResult(np.vstack(cdfLst).T)
-        self._setObservability(np.vstack(obsLst).T)
+        self._bins = VectorResult(bins)
+        self._cdf = VectorResult(self._calcCDF(bins))
+        self._setObservability(self._calcObservability(flatIdx,
+                                            minReq[inRange], numReps))
         self._moments = Moments(contribs, paramIndex, self.xrange, fractions)
 
-    def _calcBins(self, contribs, parValues, fraction, minReq):
-        """Returns np arrays for the bin values, observability and the CDF
-        based on the bin values."""
-        # single set of R for this calculation
-        bins = np.zeros(self.binCount)
-        binObs = np.zeros(self.binCount)
-        for bi in range(self.binCount):
-            val, obs = self._calcBin(
-                    self._binMask(bi, parValues),
-                    fraction, minReq)
-            bins[bi] = val
-            binObs[bi] = obs
-            cdf = self._calcCDF(bins)
-        return bins, binObs, cdf
-
-    def _calcBin(self, binMask, fraction, minReq):
-        """
-           *fraction*: overall fraction (number or volume, weighting depending)
-        """
-        # y contains the volume fraction for that radius bin
-        binValue = sum(fraction[binMask])
-        if np.isnan(binValue):
-            binValue = 0.
-        # observability below
-        if not any(binMask):
-            binMinReq = 0.
-        else:
-            binMinReq = minReq[binMask].mean()
-        return binValue, binMinReq
+    def _binSums(self, flatIdx, values, numReps):
+        """Sums up the *values* in the bins of all repetitions given by their
+        flat indices, see :py:meth:`_calcRepetitions`.
+        Returns an array <number of bins x number of repetitions>."""
+        return np.bincount(flatIdx, weights = values,
+                           minlength = self.binCount * numReps
+                          ).reshape((self.binCount, numReps))
+
+    def _calcObservability(self, flatIdx, minReq, numReps):
+        """Returns the mean minimum required fraction of the contributions
+        in each bin of each repetition, zero for empty bins."""
+        sums = self._binSums(flatIdx, minReq, numReps)
+        counts = self._binSums(flatIdx, None, numReps)
+        binObs = np.zeros_like(sums)
+        np.divide(sums, counts, out = binObs, where = (counts > 0))
+        return binObs
 
     def _calcCDF(self, bins):
-        cdf = np.zeros_like(bins)
-        cdf[0] = bins[0]
-        for i in range(1, len(cdf)):
-            cdf[i] = cdf[i - 1] + bins[i]
-        if cdf.max() == 0.0:
-            return np.zeros_like(bins)
-        cdf /= cdf.max() # normalized to max == 1
+        """Returns the cumulative distribution of the bins of each
+        repetition, normalized to its maximum; zero if that is zero."""
+        cdf = np.cumsum(bins, axis = 0)
+        cdfMax = cdf.max(axis = 0)
+        valid = (cdfMax != 0.)
+        cdf[:, valid] /= cdfMax[valid] # normalized to max == 1
+        cdf[:, ~valid] = 0.
         return cdf
 
     def __str__(self):
@@ -686,9 +710,9 @@ class FitParameterBase(ParameterBase):
             # index == -1 means the last, not yet existing entry
             index = len(tempVal) + index + 1
 
-        while len(tempVal) <= index:
-            # expand list to allow storage of value
-            tempVal.append(None)
+        if len(tempVal) <= index:
+            # expand list to allow storage of value, in a single step
+            tempVal.extend([None] * (index + 1 - len(tempVal)))
 
         tempVal[index] = val
         selforcls.setActiveValues(tempVal)
@@ -715,10 +739,15 @@ class FitParameterNumerical(FitParameterBase, ParameterNumerical):
     def generate(self, lower = None, upper = None, count = 1):
         # self.activeRange() is always within self.valueRange() per definition
         # therefore, using the parent implementation
+        # both ranges are stored in ascending order, see setActiveRange()
+        activeRange = self._activeRange # attribute read, see activeRange()
+        if activeRange is None:
+            activeRange = self.valueRange()
+        activeLower, activeUpper = activeRange
         if lower is None:
-            lower = min(self.activeRange())
+            lower = activeLower
         if upper is None:
-            upper = max(self.activeRange())
+            upper = activeUpper
 
         return super(FitParameterNumerical, self).generate(
                      lower = lower, upper = upper,
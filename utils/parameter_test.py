@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# utils/parameter_test.py
+
+from __future__ import absolute_import # PEP328
+from builtins import range
+import numpy
+from numpy.testing import assert_allclose
+from models.sphere import Sphere
+from utils.parameter import Histogram
+
+def getHistogram(xscale, lower = 1., upper = 100., binCount = 12):
+    hist = Histogram(Sphere().radius, lower, upper, binCount, xscale, 'vol')
+    hist._setXLowerEdge()
+    return hist
+
+def getParValues(hist, numContribs = 50, numReps = 4, seed = 1):
+    """Random values within and beyond the histogram range, some of them
+    exactly on the bin edges."""
+    rs = numpy.random.RandomState(seed)
+    parValues = rs.uniform(.5 * hist.lower, 1.5 * hist.upper,
+                           (numContribs, numReps))
+    edges = hist.xLowerEdge
+    parValues[:len(edges), 0] = edges
+    parValues[:len(edges), -1] = edges[::-1]
+    return parValues
+
+def referenceBinSums(hist, parValues, values):
+    """Histograms each repetition on its own. Unlike numpy.histogram(),
+    the upper edge of the last bin is excluded."""
+    sums = numpy.zeros((hist.binCount, parValues.shape[1]))
+    for rep in range(parValues.shape[1]):
+        valid = (parValues[:, rep] < hist.upper)
+        sums[:, rep] = numpy.histogram(parValues[valid, rep],
+                                       bins = hist.xLowerEdge,
+                                       weights = values[valid, rep])[0]
+    return sums
+
+def testBinSums():
+    rs = numpy.random.RandomState(2)
+    for xscale in 'lin', 'log':
+        hist = getHistogram(xscale)
+        parValues = getParValues(hist)
+        numReps = parValues.shape[1]
+        values = rs.uniform(size = parValues.shape)
+        binIdx = hist._binIndices(parValues)
+        inRange = (binIdx >= 0)
+        # values out of range are excluded, those on the edges are not
+        assert inRange.sum() < inRange.size
+        assert inRange[:hist.binCount, 0].all()
+        assert not inRange[hist.binCount, 0] # upper edge
+        flatIdx = (binIdx * numReps + numpy.arange(numReps))[inRange]
+        assert_allclose(hist._binSums(flatIdx, values[inRange], numReps),
+                        referenceBinSums(hist, parValues, values))
+        # a value on a bin edge belongs to the bin starting there
+        assert (binIdx[:hist.binCount, 0]
+                == numpy.arange(hist.binCount)).all()
+
+def referenceBins(hist, parValues, fraction, minReq):
+    """The previous loop over the bins of each repetition, returns the bin
+    values, observability and CDF of shape <number of bins x number of
+    repetitions>."""
+    shape = (hist.binCount, parValues.shape[1])
+    bins, binObs, cdf = (numpy.zeros(shape), numpy.zeros(shape),
+                         numpy.zeros(shape))
+    edges = hist.xLowerEdge
+    for rep in range(shape[1]):
+        for bi in range(hist.binCount):
+            binMask = ((parValues[:, rep] >= edges[bi])
+                       * (parValues[:, rep] < edges[bi + 1]))
+            bins[bi, rep] = sum(fraction[binMask, rep])
+            if any(binMask):
+                binObs[bi, rep] = minReq[binMask, rep].mean()
+        cdf[0, rep] = bins[0, rep]
+        for bi in range(1, hist.binCount):
+            cdf[bi, rep] = cdf[bi - 1, rep] + bins[bi, rep]
+        if cdf[:, rep].max() == 0.:
+            cdf[:, rep] = 0.
+        else:
+            cdf[:, rep] /= cdf[:, rep].max()
+    return bins, binObs, cdf
+
+def testObservabilityCDF():
+    """Observability and CDF of all repetitions at once equal those of
+    each repetition, also of one without any contribution in range."""
+    rs = numpy.random.RandomState(3)
+    for xscale in 'lin', 'log':
+        hist = getHistogram(xscale)
+        parValues = getParValues(hist, seed = 4)
+        # no contribution in range in the last repetition
+        parValues[:, -1] = 2. * hist.upper
+        numReps = parValues.shape[1]
+        fraction = rs.uniform(size = parValues.shape)
+        minReq = rs.uniform(size = parValues.shape)
+        binIdx = hist._binIndices(parValues)
+        inRange = (binIdx >= 0)
+        flatIdx = (binIdx * numReps + numpy.arange(numReps))[inRange]
+        bins, binObs, cdf = referenceBins(hist, parValues, fraction, minReq)
+        assert (binObs == 0.).any() # covers empty bins
+        assert_allclose(hist._calcObservability(flatIdx, minReq[inRange],
+                                                numReps), binObs)
+        assert_allclose(hist._calcCDF(bins), cdf)
+
+# vim: set ts=4 sts=4 sw=4 tw=0: